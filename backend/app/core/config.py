@@ -1,12 +1,14 @@
 from pydantic_settings import BaseSettings
 from pydantic import ConfigDict
 from typing import Optional
+from functools import lru_cache, cached_property
 import os
 import sys
 from pathlib import Path
 
+@lru_cache(maxsize=1)
 def get_data_directory():
-    """Get the appropriate directory for storing application data."""
+    """Get the appropriate directory for storing application data (resolved once per process)."""
     if getattr(sys, 'frozen', False):  # Running as exe (PyInstaller)
         # For exe: use %APPDATA%\SwatchX on Windows
         if os.name == 'nt':  # Windows
@@ -17,7 +19,8 @@ def get_data_directory():
         data_dir = Path('./data')
     
     # Create directory if it doesn't exist
-    data_dir.mkdir(parents=True, exist_ok=True)
+    if not data_dir.exists():
+        data_dir.mkdir(parents=True, exist_ok=True)
     return data_dir
 
 class Settings(BaseSettings):
@@ -27,7 +30,30 @@ class Settings(BaseSettings):
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 30
     
-    @property
+    # Verified bearer tokens are remembered (token digest -> user id) for this long
+    token_cache_ttl: int = 60
+    token_cache_size: int = 10_000
+    
+    # Threads for the batched password hash/verify helpers, shared by all requests. Each argon2
+    # call holds its 64 MiB memory cost while it runs, so this caps their memory at kdf_workers x 64 MiB
+    kdf_workers: int = min(4, os.cpu_count() or 1)
+    
+    # ASGI server; one process by default (the bundled app is a single SQLite writer).
+    # Server deployments can opt into more workers via SERVER_WORKERS.
+    server_workers: int = 1
+    # Per-worker cap on in-flight requests; extra requests get 503 instead of queueing
+    server_limit_concurrency: Optional[int] = None
+    # Threads available to sync (def) handlers; matches db_pool_size + db_max_overflow
+    # so every handler thread can hold a connection without queueing on the pool
+    threadpool_size: int = 60
+    
+    # Database connection pool (per worker process)
+    db_pool_size: int = 20
+    db_max_overflow: int = 40
+    db_pool_timeout: int = 30
+    db_pool_recycle: int = 3600
+    
+    @cached_property
     def database_url(self) -> str:
         """Get database URL with appropriate path for development or production."""
         data_dir = get_data_directory()
@@ -39,4 +65,9 @@ class Settings(BaseSettings):
         extra="ignore"  # Allow extra fields for backward compatibility
     )
 
-settings = Settings()
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Return the process-wide settings, parsing the environment only once."""
+    return Settings()
+
+settings = get_settings()
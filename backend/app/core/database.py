@@ -1,13 +1,54 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import declarative_base, sessionmaker
-from .config import settings
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.orm import DeclarativeBase, sessionmaker
+from sqlalchemy.pool import StaticPool
+from .config import get_settings
 
-engine = create_engine(
-    settings.database_url, connect_args={"check_same_thread": False}
+settings = get_settings()
+
+SQLITE_PRAGMAS = (
+    "journal_mode=WAL",
+    "synchronous=NORMAL",
+    "temp_store=MEMORY",
+    "mmap_size=268435456",
+    "cache_size=-65536",
+    "foreign_keys=ON",
 )
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-Base = declarative_base()
+def _set_sqlite_pragma(dbapi_conn, connection_record):
+    """Apply WAL mode, cache tuning and foreign key enforcement to every new SQLite connection."""
+    cursor = dbapi_conn.cursor()
+    for pragma in SQLITE_PRAGMAS:
+        cursor.execute(f"PRAGMA {pragma}")
+    cursor.close()
+
+def make_engine(url: str, testing: bool = False):
+    """
+    Build a SQLite engine with the connection PRAGMAs applied.
+    No pre-ping: a connection to a local database file cannot go stale, so a checkout
+    is a plain queue pop. Testing engines use StaticPool so every session shares one
+    in-memory database and schema, with the same foreign key enforcement as production.
+    """
+    connect_args = {"check_same_thread": False, "timeout": 30}
+    if testing:
+        engine = create_engine(url, connect_args=connect_args, poolclass=StaticPool)
+    else:
+        engine = create_engine(
+            url,
+            connect_args=connect_args,
+            pool_size=settings.db_pool_size,
+            max_overflow=settings.db_max_overflow,
+            pool_timeout=settings.db_pool_timeout,
+            pool_recycle=settings.db_pool_recycle,
+        )
+    event.listen(engine, "connect", _set_sqlite_pragma)
+    return engine
+
+engine = make_engine(settings.database_url)
+
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
+
+class Base(DeclarativeBase):
+    pass
 
 def get_db():
     db = SessionLocal()
@@ -15,3 +56,56 @@ def get_db():
         yield db
     finally:
         db.close()
+
+def get_session_factory():
+    """
+    Session factory for streaming responses, which must open their own session:
+    the get_db session is not guaranteed to outlive the handler.
+    """
+    return SessionLocal
+
+def rewrite_legacy_enum_names(connection):
+    """
+    Rewrite expense company/category values written by the old SQLEnum columns, which
+    stored member names ('SWATCH', 'FUEL_DIESEL'), to the enum values the String columns
+    hold. Idempotent: once rewritten no row matches a member name.
+    """
+    # Imported here because the models import Base from this module
+    from ..models.expense import CompanyEnum, ExpenseCategoryEnum
+    for column, enum_cls in (("company", CompanyEnum), ("category", ExpenseCategoryEnum)):
+        for member in enum_cls:
+            if member.name != member.value:
+                connection.execute(
+                    text(f"UPDATE expenses SET {column} = :value WHERE {column} = :name"),
+                    {"value": member.value, "name": member.name}
+                )
+
+def create_missing_schema(bind=None):
+    """
+    Create the tables and indexes absent from the database, skipping DDL once the schema exists.
+    Indexes added to existing tables are created here too, since create_all skips those tables,
+    and expense rows still in the old enum-name format are rewritten.
+    """
+    bind = bind if bind is not None else engine
+    existing = set(inspect(bind).get_table_names())
+    missing = [table for name, table in Base.metadata.tables.items() if name not in existing]
+    if missing:
+        Base.metadata.create_all(bind=bind, tables=missing)
+    
+    with bind.begin() as connection:
+        present = set(connection.scalars(text("SELECT name FROM sqlite_master WHERE type = 'index'")))
+        for name, table in Base.metadata.tables.items():
+            if name not in existing:
+                continue
+            for index in table.indexes:
+                if index.name not in present:
+                    index.create(bind=connection)
+        if "expenses" in existing:
+            rewrite_legacy_enum_names(connection)
+
+def warm_connection_pool():
+    """Open pool_size connections up front so early requests skip connect and PRAGMA setup."""
+    connections = [engine.connect() for _ in range(settings.db_pool_size)]
+    for connection in connections:
+        connection.execute(text("SELECT 1"))
+        connection.close()
@@ -1,22 +1,78 @@
 from passlib.context import CryptContext
+from cachetools import TLRUCache
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+import hashlib
+import threading
+import time
 from jose import JWTError, jwt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy import func, lambda_stmt, select
 from sqlalchemy.orm import Session
 from .config import settings
 from .database import get_db
 from ..models.user import User
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Argon2id for new hashes; bcrypt is kept only to verify (and upgrade) legacy hashes
+pwd_context = CryptContext(schemes=["argon2", "bcrypt"], deprecated="auto")
 security = HTTPBearer()
 
+# The argon2 and bcrypt backends release the GIL, so independent KDF calls run in parallel here.
+# Bounded by kdf_workers: every in-flight argon2 call holds its full memory cost.
+kdf_executor = ThreadPoolExecutor(max_workers=settings.kdf_workers, thread_name_prefix="kdf")
+
+# Verified tokens: blake2b(token) -> (user id, token sub, token exp). An entry lives for
+# token_cache_ttl seconds but never past the token's own expiry. The cache is per process,
+# so a hit is only trusted while the row it names still belongs to the token's subject.
+token_cache = TLRUCache(
+    maxsize=settings.token_cache_size,
+    ttu=lambda _key, value, now: min(now + settings.token_cache_ttl, value[2]),
+    timer=time.time,
+)
+token_cache_lock = threading.Lock()
+
+def warm_password_context():
+    """Load the hashing backend (and run passlib's self-test) before the first login needs it."""
+    pwd_context.handler().get_backend()
+    _dummy_password_hash()
+
+@lru_cache(maxsize=1)
+def _dummy_password_hash() -> str:
+    return get_password_hash("not-a-real-password-used-for-timing")
+
+def verify_dummy_password(plain_password: str) -> None:
+    """Spend one KDF verification so a login for an unknown email costs as much as a real one."""
+    verify_password(plain_password, _dummy_password_hash())
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
+def get_user(db: Session, email: str):
+    """
+    Look up a user by email, case-insensitively, backed by the lower(email) index.
+    Uses a lambda statement so the compiled SQL is cached across calls.
+    """
+    email = email.lower()
+    stmt = lambda_stmt(lambda: select(User).where(func.lower(User.email) == email))
+    return db.execute(stmt).scalar_one_or_none()
+
+def verify_passwords(pairs: list[tuple[str, str]]) -> list[bool]:
+    """Verify several independent (plain, hashed) pairs concurrently."""
+    return list(kdf_executor.map(lambda pair: verify_password(*pair), pairs))
+
+def verify_and_update_password(plain_password: str, hashed_password: str) -> tuple[bool, str | None]:
+    """Verify a password and return a replacement hash when the stored one uses a deprecated scheme."""
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
+def get_password_hashes(passwords: list[str]) -> list[str]:
+    """Hash several independent secrets concurrently, preserving input order."""
+    return list(kdf_executor.map(get_password_hash, passwords))
+
 def create_access_token(data: dict, expires_delta: timedelta | None = None):
     to_encode = data.copy()
     if expires_delta:
@@ -27,40 +83,72 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None):
     encoded_jwt = jwt.encode(to_encode, settings.secret_key, algorithm=settings.algorithm)
     return encoded_jwt
 
-def verify_token(token: str):
+def decode_token(token: str) -> dict | None:
     try:
-        payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
-        email: str = payload.get("sub")
-        if email is None:
-            return None
-        return email
+        return jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
     except JWTError:
         return None
 
-async def get_current_user(
+def verify_token(token: str):
+    payload = decode_token(token)
+    if payload is None:
+        return None
+    return payload.get("sub")
+
+def _token_key(token: str) -> bytes:
+    return hashlib.blake2b(token.encode(), digest_size=16).digest()
+
+def get_token_user(db: Session, token: str) -> User | None:
+    """
+    Resolve a bearer token to its user. Tokens seen recently skip the JWT
+    verification and the email lookup; the user is loaded by primary key and
+    must still carry the token's email, since SQLite reuses the ids of deleted rows.
+    """
+    key = _token_key(token)
+    with token_cache_lock:
+        cached = token_cache.get(key)
+    if cached is not None:
+        user_id, email, _exp = cached
+        user = db.get(User, user_id)
+        if user is not None and user.email.lower() == email.lower():
+            return user
+        with token_cache_lock:
+            token_cache.pop(key, None)
+
+    payload = decode_token(token)
+    email = payload.get("sub") if payload else None
+    if email is None:
+        return None
+    user = get_user(db, email)
+    if user is not None and "exp" in payload:
+        with token_cache_lock:
+            token_cache[key] = (user.id, email, payload["exp"])
+    return user
+
+def forget_user_tokens(user_id: int):
+    """Drop cached tokens for a user, e.g. after a password change or account deletion."""
+    with token_cache_lock:
+        for key in [key for key, value in token_cache.items() if value[0] == user_id]:
+            token_cache.pop(key, None)
+
+def require_token_user(db: Session, token: str) -> User:
+    """Resolve a bearer token to its user or fail with 401. Shared by both bearer dependencies."""
+    user = get_token_user(db, token)
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return user
+
+def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db)
 ):
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
-    
-    try:
-        token = credentials.credentials
-        email = verify_token(token)
-        if email is None:
-            raise credentials_exception
-    except JWTError:
-        raise credentials_exception
-    
-    user = db.query(User).filter(User.email == email).first()
-    if user is None:
-        raise credentials_exception
-    return user
+    return require_token_user(db, credentials.credentials)
 
-async def get_current_active_user(current_user: User = Depends(get_current_user)):
+def get_current_active_user(current_user: User = Depends(get_current_user)):
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
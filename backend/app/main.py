@@ -1,16 +1,53 @@
+from contextlib import asynccontextmanager
+import anyio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from .core.database import engine, Base
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
+from .core.config import settings
+from .core.database import create_missing_schema, warm_connection_pool
+from .core.security import warm_password_context
 from .routers.auth import router as auth_router
 from .routers.expenses import router as expenses_router
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+class SelectiveGZipMiddleware:
+    """
+    GZip responses except binary downloads: attachments (PDFs, images) and XLSX
+    exports are already compressed, so those paths bypass compression entirely.
+    """
+
+    def __init__(self, app, skip_prefixes=(), skip_suffixes=(), **options):
+        self.app = app
+        self.gzip = GZipMiddleware(app, **options)
+        self.skip_prefixes = tuple(skip_prefixes)
+        self.skip_suffixes = tuple(skip_suffixes)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            path = scope["path"]
+            if path.startswith(self.skip_prefixes) or path.endswith(self.skip_suffixes):
+                await self.app(scope, receive, send)
+                return
+        await self.gzip(scope, receive, send)
+
+def configure_threadpool():
+    """Size the anyio threadpool that runs sync handlers (default 40 threads)."""
+    anyio.to_thread.current_default_thread_limiter().total_tokens = settings.threadpool_size
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    configure_threadpool()
+    create_missing_schema()
+    warm_connection_pool()
+    warm_password_context()
+    yield
 
 app = FastAPI(
     title="SwatchX API",
     description="A full-stack web application API",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # Configure CORS
@@ -18,8 +55,18 @@ app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:5173", "http://127.0.0.1:5173", "http://localhost:5174", "http://127.0.0.1:5174"],  # Include both possible Vite ports
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=["GET", "POST", "PUT", "PATCH", "DELETE"],
+    allow_headers=["authorization", "content-type"],
+    expose_headers=["X-Total-Count"],  # Lets the frontend read include_total's count
+    max_age=86400,  # Let browsers cache preflight responses for a day
+)
+
+# Compress JSON list responses; small bodies are not worth the CPU
+app.add_middleware(
+    SelectiveGZipMiddleware,
+    minimum_size=1024,
+    skip_prefixes=("/api/v1/export/",),
+    skip_suffixes=("/attachment",),
 )
 
 # Include routers
@@ -1,6 +1,8 @@
-from sqlalchemy import Column, Integer, String, DateTime, Float, ForeignKey, Enum as SQLEnum
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import String, DateTime, Float, ForeignKey, Index, CheckConstraint
 from sqlalchemy.sql import func
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import Mapped, mapped_column, relationship
 from enum import Enum
 from ..core.database import Base
 
@@ -20,68 +22,87 @@ class ExpenseCategoryEnum(str, Enum):
     FUEL_DIESEL = "fuel-diesel"
     DEF = "def"
 
+def enum_check(column: str, enum_cls) -> str:
+    """Build a CHECK expression restricting a string column to an enum's values."""
+    allowed = ", ".join(f"'{member.value}'" for member in enum_cls)
+    return f"{column} IN ({allowed})"
+
 # Management entities
 class BusinessUnit(Base):
     __tablename__ = "business_units"
     
-    id = Column(Integer, primary_key=True, index=True)
-    name = Column(String(100), nullable=False, unique=True)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    id: Mapped[int] = mapped_column(primary_key=True)
+    name: Mapped[str] = mapped_column(String(100), unique=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    updated_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), onupdate=func.now())
 
 class Truck(Base):
     __tablename__ = "trucks"
     
-    id = Column(Integer, primary_key=True, index=True)
-    number = Column(String(50), nullable=False, unique=True)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    id: Mapped[int] = mapped_column(primary_key=True)
+    number: Mapped[str] = mapped_column(String(50), unique=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    updated_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), onupdate=func.now())
 
 class Trailer(Base):
     __tablename__ = "trailers"
     
-    id = Column(Integer, primary_key=True, index=True)
-    number = Column(String(50), nullable=False, unique=True)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    id: Mapped[int] = mapped_column(primary_key=True)
+    number: Mapped[str] = mapped_column(String(50), unique=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    updated_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), onupdate=func.now())
 
 class FuelStation(Base):
     __tablename__ = "fuel_stations"
     
-    id = Column(Integer, primary_key=True, index=True)
-    name = Column(String(100), nullable=False, unique=True)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    id: Mapped[int] = mapped_column(primary_key=True)
+    name: Mapped[str] = mapped_column(String(100), unique=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    updated_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), onupdate=func.now())
 
 # Main expense model
 class Expense(Base):
     __tablename__ = "expenses"
     
-    id = Column(Integer, primary_key=True, index=True)
-    company = Column(SQLEnum(CompanyEnum), nullable=False)
-    category = Column(SQLEnum(ExpenseCategoryEnum), nullable=False)
-    date = Column(DateTime, nullable=False)
-    price = Column(Float, nullable=False)
+    id: Mapped[int] = mapped_column(primary_key=True)
+    company: Mapped[str] = mapped_column(String(20))
+    category: Mapped[str] = mapped_column(String(20))
+    date: Mapped[datetime] = mapped_column(DateTime)
+    price: Mapped[float] = mapped_column(Float)
     
     # Optional fields based on category
-    description = Column(String(500), nullable=True)
-    gallons = Column(Float, nullable=True)
+    description: Mapped[Optional[str]] = mapped_column(String(500))
+    gallons: Mapped[Optional[float]] = mapped_column(Float)
     
-    # Foreign key relationships
-    business_unit_id = Column(Integer, ForeignKey("business_units.id"), nullable=True)
-    truck_id = Column(Integer, ForeignKey("trucks.id"), nullable=True)
-    trailer_id = Column(Integer, ForeignKey("trailers.id"), nullable=True)
-    fuel_station_id = Column(Integer, ForeignKey("fuel_stations.id"), nullable=True)
+    # Foreign key relationships; RESTRICT keeps referenced management entities from being deleted
+    business_unit_id: Mapped[Optional[int]] = mapped_column(ForeignKey("business_units.id", ondelete="RESTRICT"))
+    truck_id: Mapped[Optional[int]] = mapped_column(ForeignKey("trucks.id", ondelete="RESTRICT"))
+    trailer_id: Mapped[Optional[int]] = mapped_column(ForeignKey("trailers.id", ondelete="RESTRICT"))
+    fuel_station_id: Mapped[Optional[int]] = mapped_column(ForeignKey("fuel_stations.id", ondelete="RESTRICT"))
     
     # File attachment
-    attachment_path = Column(String(500), nullable=True)
+    attachment_path: Mapped[Optional[str]] = mapped_column(String(500))
     
     # Relationships
-    business_unit = relationship("BusinessUnit")
-    truck = relationship("Truck")
-    trailer = relationship("Trailer")
-    fuel_station = relationship("FuelStation")
+    business_unit: Mapped[Optional[BusinessUnit]] = relationship()
+    truck: Mapped[Optional[Truck]] = relationship()
+    trailer: Mapped[Optional[Trailer]] = relationship()
+    fuel_station: Mapped[Optional[FuelStation]] = relationship()
     
     # Metadata
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    updated_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), onupdate=func.now())
+    
+    # Value constraints and indexes for filtered listings, date-range analytics and FK lookups
+    __table_args__ = (
+        CheckConstraint(enum_check("company", CompanyEnum), name="ck_expense_company"),
+        CheckConstraint(enum_check("category", ExpenseCategoryEnum), name="ck_expense_category"),
+        Index("ix_expense_date", "date"),
+        Index("ix_expense_company_date", "company", "date"),
+        Index("ix_expense_category_date", "category", "date"),
+        Index("ix_expense_company_category_date", "company", "category", "date"),
+        Index("ix_expense_business_unit", "business_unit_id"),
+        Index("ix_expense_truck", "truck_id"),
+        Index("ix_expense_trailer", "trailer_id"),
+        Index("ix_expense_fuel_station", "fuel_station_id"),
+    )
@@ -1,22 +1,47 @@
-from sqlalchemy import Boolean, Column, Integer, String, DateTime
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import String, DateTime, Index, and_
+from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.sql import func
+from sqlalchemy.orm import Mapped, mapped_column
 from ..core.database import Base
 
 class User(Base):
     __tablename__ = "users"
 
-    id = Column(Integer, primary_key=True, index=True)
-    email = Column(String(254), unique=True, index=True, nullable=False)
-    name = Column(String(100), nullable=True)
-    hashed_password = Column(String(255), nullable=False)
-    is_active = Column(Boolean, default=True, nullable=False)
-    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    id: Mapped[int] = mapped_column(primary_key=True)
+    email: Mapped[str] = mapped_column(String(254))
+    name: Mapped[Optional[str]] = mapped_column(String(100))
+    hashed_password: Mapped[str] = mapped_column(String(255))
+    is_active: Mapped[bool] = mapped_column(default=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    updated_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), onupdate=func.now())
     
     # Security questions for password reset
-    security_question_1 = Column(String(500), nullable=True)
-    security_answer_1_hash = Column(String(255), nullable=True)
-    security_question_2 = Column(String(500), nullable=True)
-    security_answer_2_hash = Column(String(255), nullable=True)
-    security_question_3 = Column(String(500), nullable=True)
-    security_answer_3_hash = Column(String(255), nullable=True)
+    security_question_1: Mapped[Optional[str]] = mapped_column(String(500))
+    security_answer_1_hash: Mapped[Optional[str]] = mapped_column(String(255))
+    security_question_2: Mapped[Optional[str]] = mapped_column(String(500))
+    security_answer_2_hash: Mapped[Optional[str]] = mapped_column(String(255))
+    security_question_3: Mapped[Optional[str]] = mapped_column(String(500))
+    security_answer_3_hash: Mapped[Optional[str]] = mapped_column(String(255))
+
+    @hybrid_property
+    def has_security_questions(self) -> bool:
+        """Whether all three security questions and answers are set up"""
+        return (
+            self.security_question_1 is not None and self.security_answer_1_hash is not None and
+            self.security_question_2 is not None and self.security_answer_2_hash is not None and
+            self.security_question_3 is not None and self.security_answer_3_hash is not None
+        )
+
+    @has_security_questions.inplace.expression
+    @classmethod
+    def _has_security_questions_expression(cls):
+        return and_(
+            cls.security_question_1.is_not(None), cls.security_answer_1_hash.is_not(None),
+            cls.security_question_2.is_not(None), cls.security_answer_2_hash.is_not(None),
+            cls.security_question_3.is_not(None), cls.security_answer_3_hash.is_not(None),
+        )
+
+# Case-insensitive uniqueness; also serves get_user's lower(email) lookups
+Index("ix_users_email_lower", func.lower(User.email), unique=True)
@@ -1,11 +1,16 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
+from sqlalchemy.dialects.sqlite import insert
 from sqlalchemy.orm import Session
 from datetime import timedelta
 
 from ..core.database import get_db
-from ..core.security import verify_password, get_password_hash, create_access_token
-from ..core.config import settings
+from ..core.security import (
+    get_user, verify_password, verify_passwords, verify_and_update_password, verify_dummy_password,
+    get_password_hash, get_password_hashes, create_access_token,
+    require_token_user, forget_user_tokens
+)
+from ..core.config import Settings, get_settings
 from ..models.user import User
 from ..schemas.user import (
     UserCreate, UserLogin, UserResponse, Token,
@@ -17,61 +22,54 @@ from ..schemas.user import (
 router = APIRouter(prefix="/auth", tags=["authentication"])
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
-def get_user(db: Session, email: str):
-    return db.query(User).filter(User.email == email).first()
+# (question, answer hash) column pairs, indexed by question_index
+SECURITY_QUESTION_FIELDS = (
+    ("security_question_1", "security_answer_1_hash"),
+    ("security_question_2", "security_answer_2_hash"),
+    ("security_question_3", "security_answer_3_hash"),
+)
 
 def authenticate_user(db: Session, email: str, password: str):
     user = get_user(db, email)
     if not user:
+        # Equalize timing with the wrong-password path to avoid user enumeration
+        verify_dummy_password(password)
         return False
-    if not verify_password(password, user.hashed_password):
+    verified, new_hash = verify_and_update_password(password, user.hashed_password)
+    if not verified:
         return False
+    if new_hash:
+        # Transparently upgrade legacy bcrypt hashes to Argon2id
+        user.hashed_password = new_hash
+        db.commit()
     return user
 
 def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
-    
-    from ..core.security import verify_token
-    email = verify_token(token)
-    if email is None:
-        raise credentials_exception
-        
-    user = get_user(db, email=email)
-    if user is None:
-        raise credentials_exception
-    return user
-
-def user_has_security_questions(user: User) -> bool:
-    """Check if user has set up security questions"""
-    return (
-        user.security_question_1 is not None and user.security_answer_1_hash is not None and
-        user.security_question_2 is not None and user.security_answer_2_hash is not None and
-        user.security_question_3 is not None and user.security_answer_3_hash is not None
-    )
+    # Same resolution as core.security.get_current_user; OAuth2PasswordBearer answers
+    # a missing header with 401 (the auth routes' contract) instead of HTTPBearer's 403
+    return require_token_user(db, token)
 
 @router.post("/signup", response_model=Token, status_code=status.HTTP_201_CREATED)
-def create_user(user: UserCreate, db: Session = Depends(get_db)):
-    # Check if user already exists (case-insensitive)
-    db_user = get_user(db, email=user.email.lower())
-    if db_user:
+def create_user(
+    user: UserCreate,
+    db: Session = Depends(get_db),
+    settings: Settings = Depends(get_settings)
+):
+    # Create new user in one statement; the lower(email) unique index makes an
+    # existing (case-insensitive) email insert nothing and return no row
+    hashed_password = get_password_hash(user.password)
+    stmt = insert(User).values(
+        email=user.email,  # Lowercased by UserCreate
+        hashed_password=hashed_password
+    ).on_conflict_do_nothing().returning(User)
+    db_user = db.execute(stmt).scalar_one_or_none()
+    if db_user is None:
+        db.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
         )
-    
-    # Create new user
-    hashed_password = get_password_hash(user.password)
-    db_user = User(
-        email=user.email.lower(),
-        hashed_password=hashed_password
-    )
-    db.add(db_user)
     db.commit()
-    db.refresh(db_user)
     
     # Create access token
     access_token_expires = timedelta(minutes=settings.access_token_expire_minutes)
@@ -79,19 +77,19 @@ def create_user(user: UserCreate, db: Session = Depends(get_db)):
         data={"sub": db_user.email}, expires_delta=access_token_expires
     )
     
-    # Include security questions status in response
-    user_response = UserResponse.model_validate(db_user)
-    user_response.has_security_questions = user_has_security_questions(db_user)
-    
     return {
         "access_token": access_token, 
         "token_type": "bearer",
-        "user": user_response
+        "user": UserResponse.model_validate(db_user)
     }
 
 @router.post("/login", response_model=Token)
-def login_user(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user_obj = authenticate_user(db, form_data.username.lower(), form_data.password)
+def login_user(
+    form_data: OAuth2PasswordRequestForm = Depends(),
+    db: Session = Depends(get_db),
+    settings: Settings = Depends(get_settings)
+):
+    user_obj = authenticate_user(db, form_data.username, form_data.password)
     if not user_obj:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -103,21 +101,15 @@ def login_user(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = D
         data={"sub": user_obj.email}, expires_delta=access_token_expires
     )
     
-    # Include security questions status in response
-    user_response = UserResponse.model_validate(user_obj)
-    user_response.has_security_questions = user_has_security_questions(user_obj)
-    
     return {
         "access_token": access_token, 
         "token_type": "bearer",
-        "user": user_response
+        "user": UserResponse.model_validate(user_obj)
     }
 
 @router.get("/me", response_model=UserResponse)
 def read_current_user(current_user: User = Depends(get_current_user)):
-    user_response = UserResponse.model_validate(current_user)
-    user_response.has_security_questions = user_has_security_questions(current_user)
-    return user_response
+    return UserResponse.model_validate(current_user)
 
 @router.post("/security-questions", response_model=dict)
 def setup_security_questions(
@@ -127,13 +119,13 @@ def setup_security_questions(
 ):
     """Set up security questions for password reset"""
     
-    # Hash the answers
-    current_user.security_question_1 = questions_data.questions[0].question
-    current_user.security_answer_1_hash = get_password_hash(questions_data.questions[0].answer)
-    current_user.security_question_2 = questions_data.questions[1].question
-    current_user.security_answer_2_hash = get_password_hash(questions_data.questions[1].answer)
-    current_user.security_question_3 = questions_data.questions[2].question
-    current_user.security_answer_3_hash = get_password_hash(questions_data.questions[2].answer)
+    # Hash the answers concurrently
+    answer_hashes = get_password_hashes([q.answer for q in questions_data.questions])
+    for (question_attr, answer_attr), question, answer_hash in zip(
+        SECURITY_QUESTION_FIELDS, questions_data.questions, answer_hashes
+    ):
+        setattr(current_user, question_attr, question.question)
+        setattr(current_user, answer_attr, answer_hash)
     
     db.commit()
     
@@ -146,7 +138,7 @@ def get_security_questions(current_user: User = Depends(get_current_user)):
         question_1=current_user.security_question_1,
         question_2=current_user.security_question_2,
         question_3=current_user.security_question_3,
-        has_security_questions=user_has_security_questions(current_user)
+        has_security_questions=current_user.has_security_questions
     )
 
 @router.put("/security-questions", response_model=dict)
@@ -157,13 +149,13 @@ def update_security_questions(
 ):
     """Update security questions"""
     
-    # Hash the new answers
-    current_user.security_question_1 = questions_data.questions[0].question
-    current_user.security_answer_1_hash = get_password_hash(questions_data.questions[0].answer)
-    current_user.security_question_2 = questions_data.questions[1].question
-    current_user.security_answer_2_hash = get_password_hash(questions_data.questions[1].answer)
-    current_user.security_question_3 = questions_data.questions[2].question
-    current_user.security_answer_3_hash = get_password_hash(questions_data.questions[2].answer)
+    # Hash the new answers concurrently
+    answer_hashes = get_password_hashes([q.answer for q in questions_data.questions])
+    for (question_attr, answer_attr), question, answer_hash in zip(
+        SECURITY_QUESTION_FIELDS, questions_data.questions, answer_hashes
+    ):
+        setattr(current_user, question_attr, question.question)
+        setattr(current_user, answer_attr, answer_hash)
     
     db.commit()
     
@@ -184,16 +176,10 @@ def update_individual_security_question(
             detail="Current password is incorrect"
         )
     
-    # Update the specific question and answer
-    if question_data.question_index == 0:
-        current_user.security_question_1 = question_data.question
-        current_user.security_answer_1_hash = get_password_hash(question_data.answer)
-    elif question_data.question_index == 1:
-        current_user.security_question_2 = question_data.question
-        current_user.security_answer_2_hash = get_password_hash(question_data.answer)
-    elif question_data.question_index == 2:
-        current_user.security_question_3 = question_data.question
-        current_user.security_answer_3_hash = get_password_hash(question_data.answer)
+    # Update the specific question and answer (index is validated by the schema)
+    question_attr, answer_attr = SECURITY_QUESTION_FIELDS[question_data.question_index]
+    setattr(current_user, question_attr, question_data.question)
+    setattr(current_user, answer_attr, get_password_hash(question_data.answer))
     
     db.commit()
     
@@ -217,6 +203,7 @@ def change_password(
     # Update password
     current_user.hashed_password = get_password_hash(password_data.new_password)
     db.commit()
+    forget_user_tokens(current_user.id)
     
     return {"message": "Password changed successfully"}
 
@@ -232,7 +219,7 @@ def request_password_reset(reset_request: PasswordResetRequest, db: Session = De
             detail="If this email is registered and has security questions set up, they will be displayed."
         )
     
-    if not user_has_security_questions(user):
+    if not user.has_security_questions:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="No security questions found for this account. Please contact support."
@@ -250,18 +237,18 @@ def verify_password_reset(reset_data: PasswordResetVerify, db: Session = Depends
     """Verify security answers and reset password"""
     
     user = get_user(db, email=reset_data.email)
-    if not user or not user_has_security_questions(user):
+    if not user or not user.has_security_questions:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Invalid reset request"
         )
     
-    # Verify all security answers
-    if not (
-        verify_password(reset_data.answers[0], user.security_answer_1_hash) and
-        verify_password(reset_data.answers[1], user.security_answer_2_hash) and
-        verify_password(reset_data.answers[2], user.security_answer_3_hash)
-    ):
+    # Verify all security answers concurrently
+    if not all(verify_passwords([
+        (reset_data.answers[0], user.security_answer_1_hash),
+        (reset_data.answers[1], user.security_answer_2_hash),
+        (reset_data.answers[2], user.security_answer_3_hash),
+    ])):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="One or more security answers are incorrect"
@@ -270,6 +257,7 @@ def verify_password_reset(reset_data: PasswordResetVerify, db: Session = Depends
     # Reset password
     user.hashed_password = get_password_hash(reset_data.new_password)
     db.commit()
+    forget_user_tokens(user.id)
     
     return {"message": "Password reset successfully"}
 
@@ -285,16 +273,8 @@ def update_profile(
     current_user.name = profile_data.name
     
     db.commit()
-    db.refresh(current_user)
     
-    return UserResponse(
-        id=current_user.id,
-        email=current_user.email,
-        name=current_user.name,
-        is_active=current_user.is_active,
-        created_at=current_user.created_at,
-        has_security_questions=user_has_security_questions(current_user)
-    )
+    return UserResponse.model_validate(current_user)
 
 @router.delete("/account", response_model=dict)
 def delete_account(
@@ -315,6 +295,7 @@ def delete_account(
     # Note: In current design, expenses are not user-specific, so we only delete the user
     db.delete(current_user)
     db.commit()
+    forget_user_tokens(current_user.id)
     
     return {
         "message": "Account deleted successfully",
@@ -1,19 +1,22 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query, UploadFile, File, Form
-from fastapi.responses import FileResponse
-from sqlalchemy.orm import Session, joinedload
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request, status, Query, UploadFile, File, Form
+from fastapi.responses import FileResponse, ORJSONResponse, Response, StreamingResponse
+from sqlalchemy.orm import Session, joinedload, load_only, raiseload, sessionmaker
 from sqlalchemy.exc import IntegrityError
-from typing import List, Optional
-from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+from pydantic import TypeAdapter
+from datetime import datetime, timedelta, timezone
+import hashlib
 import json
 import os
 import tempfile
-from calendar import monthrange
-from sqlalchemy import func, extract
+from sqlalchemy import String, cast, delete, func, extract, insert, lambda_stmt, or_, select, tuple_, update
 from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.utils import get_column_letter
 from openpyxl.styles import Font, PatternFill, Alignment, NamedStyle
 from openpyxl.styles.numbers import FORMAT_CURRENCY_USD_SIMPLE
 
-from ..core.database import get_db
+from ..core.database import get_db, get_session_factory
 from ..core.security import get_current_active_user
 from ..models.user import User
 from ..models.expense import Expense, BusinessUnit, Truck, Trailer, FuelStation, CompanyEnum, ExpenseCategoryEnum
@@ -22,12 +25,31 @@ from ..schemas.expense import (
     BusinessUnitCreate, BusinessUnitUpdate, BusinessUnit as BusinessUnitSchema,
     TruckCreate, TruckUpdate, Truck as TruckSchema,
     TrailerCreate, TrailerUpdate, Trailer as TrailerSchema,
-    FuelStationCreate, FuelStationUpdate, FuelStation as FuelStationSchema
+    FuelStationCreate, FuelStationUpdate, FuelStation as FuelStationSchema,
+    ExpenseListItem, EXPENSE_LIST_ADAPTER
 )
 from ..utils.file_handler import file_handler
 
 router = APIRouter()
 
+# Upper bound on one bulk create request
+MAX_BULK_EXPENSES = 1000
+# Rows fetched per batch when streaming the expense listing
+EXPENSE_STREAM_BATCH = 500
+# Eager loads for an expense's references, limited to the columns responses use
+EXPENSE_RELATIONSHIP_LOADS = (
+    joinedload(Expense.business_unit).load_only(BusinessUnit.id, BusinessUnit.name),
+    joinedload(Expense.truck).load_only(Truck.id, Truck.number),
+    joinedload(Expense.trailer).load_only(Trailer.id, Trailer.number),
+    joinedload(Expense.fuel_station).load_only(FuelStation.id, FuelStation.name),
+)
+# Expense foreign key column per management entity, for reference checks on delete
+EXPENSE_FK_COLUMNS = {
+    "business_unit": Expense.business_unit_id,
+    "truck": Expense.truck_id,
+    "trailer": Expense.trailer_id,
+    "fuel_station": Expense.fuel_station_id,
+}
 def validate_expense_data(expense_data: dict, db: Session) -> dict:
     """Validate expense data including date, price, and description requirements."""
     # Validate date
@@ -35,9 +57,9 @@ def validate_expense_data(expense_data: dict, db: Session) -> dict:
         raise HTTPException(status_code=400, detail="Date is required")
     
     try:
-        date_obj = datetime.fromisoformat(expense_data['date'].replace('Z', '+00:00'))
+        # Python 3.11+ parses the trailing 'Z' itself
+        date_obj = datetime.fromisoformat(expense_data['date'])
         # Check if date is not in the future
-        from datetime import timezone
         if date_obj > datetime.now(timezone.utc):
             raise HTTPException(status_code=400, detail="Date cannot be in the future")
     except ValueError:
@@ -63,11 +85,43 @@ def validate_expense_data(expense_data: dict, db: Session) -> dict:
     return expense_data
 
 def check_duplicate_entity(db: Session, model, field_name: str, value: str, exclude_id: int = None) -> bool:
-    """Check if an entity with the same field value already exists."""
-    query = db.query(model).filter(getattr(model, field_name) == value)
+    """Check if an entity with the same field value already exists (SELECT EXISTS, no row load)."""
+    query = select(model.id).where(getattr(model, field_name) == value)
     if exclude_id:
-        query = query.filter(model.id != exclude_id)
-    return query.first() is not None
+        query = query.where(model.id != exclude_id)
+    return db.scalar(select(query.exists()))
+
+def serialize_list_response(adapter: TypeAdapter, rows: list,
+                            headers: Optional[dict] = None) -> Response:
+    """
+    Validate ORM rows and encode them to JSON with a pre-built list adapter.
+    Skips FastAPI's per-item response_model validation and jsonable_encoder pass.
+    """
+    items = adapter.validate_python(rows, from_attributes=True)
+    return Response(content=adapter.dump_json(items), media_type="application/json", headers=headers)
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Weak If-None-Match comparison against the given ETag."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    tags = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return "*" in tags or etag.removeprefix("W/") in tags
+
+def serialize_rows_response(db: Session, stmt, request: Request) -> Response:
+    """
+    Run a column-level SELECT and encode its rows to JSON with orjson.
+    Skips ORM instance construction and pydantic validation for read-only listings.
+    The ETag is a hash of the body, so a client revalidating an unchanged list
+    gets an empty 304 instead of the payload.
+    """
+    response = ORJSONResponse([dict(row) for row in db.execute(stmt).mappings()])
+    etag = f'W/"{hashlib.blake2b(response.body, digest_size=16).hexdigest()}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+    return response
 
 def serialize_expense_with_relationships(expense: Expense) -> dict:
     """
@@ -111,53 +165,163 @@ def get_expense_with_relationships(db: Session, expense_id: int) -> Expense:
     """
     Get expense with all relationships loaded.
     Centralizes the query logic to avoid duplication.
+    Uses a lambda statement so the statement is built and compiled once, not per request.
     """
-    return db.query(Expense).options(
-        joinedload(Expense.business_unit),
-        joinedload(Expense.truck),
-        joinedload(Expense.trailer),
-        joinedload(Expense.fuel_station)
-    ).filter(Expense.id == expense_id).first()
+    stmt = lambda_stmt(lambda: select(Expense).options(
+        *EXPENSE_RELATIONSHIP_LOADS,
+        raiseload("*")
+    ).where(Expense.id == expense_id))
+    return db.execute(stmt).scalar_one_or_none()
 
-def get_expenses_with_relationships(db: Session, company: Optional[CompanyEnum] = None, 
-                                  category: Optional[ExpenseCategoryEnum] = None, 
-                                  skip: int = 0, limit: int = 100) -> List[Expense]:
+def get_attachment_path_row(db: Session, expense_id: int):
+    """Fetch only an expense's attachment_path; None when the expense does not exist."""
+    stmt = lambda_stmt(lambda: select(Expense.attachment_path).where(Expense.id == expense_id))
+    return db.execute(stmt).first()
+
+def filtered_expenses_query(db: Session, company: Optional[CompanyEnum] = None,
+                            category: Optional[ExpenseCategoryEnum] = None,
+                            before: Optional[tuple] = None, *columns):
     """
-    Get expenses with all relationships loaded and optional filtering.
-    Centralizes the query logic to avoid duplication.
+    Build the expense listing query: relationships eagerly loaded, filters applied,
+    newest first. Extra columns (e.g. a window count) are selected alongside Expense.
     """
-    query = db.query(Expense).options(
-        joinedload(Expense.business_unit),
-        joinedload(Expense.truck),
-        joinedload(Expense.trailer),
-        joinedload(Expense.fuel_station)
+    query = db.query(Expense, *columns).options(
+        *EXPENSE_RELATIONSHIP_LOADS,
+        raiseload("*")
     )
     
     if company:
         query = query.filter(Expense.company == company)
     if category:
         query = query.filter(Expense.category == category)
+    if before:
+        # Index seek past the cursor instead of reading and discarding `skip` rows
+        query = query.filter(tuple_(Expense.date, Expense.id) < tuple_(*before))
     
+    # Newest first; served by a backward scan of the date (or company, date) index
+    return query.order_by(Expense.date.desc(), Expense.id.desc())
+
+def get_expenses_with_relationships(db: Session, company: Optional[CompanyEnum] = None, 
+                                  category: Optional[ExpenseCategoryEnum] = None, 
+                                  skip: int = 0, limit: int = 100,
+                                  before: Optional[tuple] = None) -> List[Expense]:
+    """
+    Get expenses with all relationships loaded and optional filtering.
+    Centralizes the query logic to avoid duplication.
+    When a (date, id) keyset cursor is given, the page starts right after that expense.
+    """
+    query = filtered_expenses_query(db, company, category, before)
     return query.offset(skip).limit(limit).all()
 
-def check_entity_usage_and_delete(db: Session, entity, entity_id: int, entity_name: str):
+def get_expenses_with_total(db: Session, company: Optional[CompanyEnum] = None,
+                            category: Optional[ExpenseCategoryEnum] = None,
+                            skip: int = 0, limit: int = 100,
+                            before: Optional[tuple] = None) -> Tuple[List[Expense], int]:
+    """
+    Get a page of expenses plus the number of rows matching the filters.
+    COUNT(*) OVER() is evaluated before LIMIT/OFFSET, so the total rides along
+    with the page instead of needing a second COUNT query.
+    """
+    total_column = func.count().over().label("total")
+    rows = filtered_expenses_query(db, company, category, before, total_column).offset(skip).limit(limit).all()
+    if rows:
+        return [row.Expense for row in rows], rows[0].total
+    if not skip:
+        return [], 0
+    # Page past the end: no row carries the window count, so count directly
+    count_query = filtered_expenses_query(db, company, category, before).order_by(None)
+    return [], count_query.with_entities(func.count(Expense.id)).scalar()
+
+def bulk_insert_expenses(db: Session, rows: List[dict]) -> List[int]:
+    """
+    Insert many expenses in one transaction via the ORM bulk INSERT path.
+    Emits batched multi-row INSERT ... RETURNING id instead of one flush per object.
+    """
+    if not rows:
+        return []
+    ids = list(db.scalars(insert(Expense).returning(Expense.id), rows))
+    db.commit()
+    return ids
+
+def create_entity(db: Session, model, values: dict, unique_field: str, label: str) -> dict:
     """
-    Check if management entity is referenced by expenses and delete if not.
-    Centralizes the deletion logic with referential integrity checks.
+    Insert a management entity after checking its unique field.
+    Shared by the business unit, truck, trailer and fuel station create endpoints.
     """
-    expense_count = db.query(Expense).filter(getattr(Expense, f"{entity_name}_id") == entity_id).count()
-    if expense_count > 0:
+    value = values[unique_field]
+    if check_duplicate_entity(db, model, unique_field, value):
+        raise HTTPException(status_code=400, detail=f"{label} with {unique_field} '{value}' already exists")
+    
+    try:
+        db_entity = model(**values)
+        db.add(db_entity)
+        db.commit()
+        
+        return {
+            **values,
+            "id": db_entity.id,
+            "created_at": db_entity.created_at,
+            "updated_at": db_entity.updated_at,
+            "message": f"{label} created successfully",
+            "status": "success"
+        }
+        
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=f"{label} {unique_field} must be unique")
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Failed to create {label.lower()}: {str(e)}")
+
+def values_changed(model, values: dict):
+    """WHERE clause matching only rows where at least one of the given columns would change."""
+    return or_(*(getattr(model, key).is_distinct_from(value) for key, value in values.items()))
+
+def update_entity(db: Session, model, entity_id: int, values: dict, label: str):
+    """
+    Update a management entity with a single UPDATE ... RETURNING statement.
+    The returned row already carries the server-computed updated_at.
+    A PUT that changes nothing matches no row, so it writes nothing and keeps updated_at.
+    """
+    updated = db.execute(
+        update(model)
+        .where(model.id == entity_id, values_changed(model, values))
+        .values(**values)
+        .returning(model)
+    ).scalar_one_or_none()
+    if updated is not None:
+        db.commit()
+        return updated
+    
+    # Either unchanged or missing; only the latter is an error
+    existing = db.get(model, entity_id)
+    if existing is None:
+        raise HTTPException(status_code=404, detail=f"{label} not found")
+    return existing
+
+def delete_unreferenced_entity(db: Session, model, entity_id: int, entity_name: str, label: str):
+    """
+    Delete a management entity in one statement unless expenses reference it.
+    Only a delete that matched nothing pays for the follow-up queries picking the error.
+    """
+    fk_column = EXPENSE_FK_COLUMNS[entity_name]
+    referenced = select(Expense.id).where(fk_column == entity_id).exists()
+    deleted_id = db.execute(
+        delete(model).where(model.id == entity_id, ~referenced).returning(model.id)
+    ).scalar_one_or_none()
+    if deleted_id is None:
+        if db.get(model, entity_id) is None:
+            raise HTTPException(status_code=404, detail=f"{label} not found")
+        expense_count = db.scalar(select(func.count()).where(fk_column == entity_id))
         raise HTTPException(
             status_code=400, 
             detail=f"Cannot delete {entity_name}: {expense_count} expense(s) reference it"
         )
-    
-    db.delete(entity)
     db.commit()
 
 # Expense endpoints
 @router.post("/expenses/", response_model=dict, status_code=status.HTTP_201_CREATED)
-async def create_expense(
+def create_expense(
     expense_data: str = Form(...),
     attachment: Optional[UploadFile] = File(None),
     db: Session = Depends(get_db),
@@ -178,7 +342,7 @@ async def create_expense(
     # Handle file upload if provided
     attachment_path = None
     if attachment:
-        attachment_path = await file_handler.save_file(attachment)
+        attachment_path = file_handler.save_file(attachment)
     
     try:
         # Create expense with attachment path
@@ -188,7 +352,6 @@ async def create_expense(
         db_expense = Expense(**expense_data_dict)
         db.add(db_expense)
         db.commit()
-        db.refresh(db_expense)
         
         # Return with relationships
         expense_with_relationships = get_expense_with_relationships(db, db_expense.id)
@@ -204,21 +367,91 @@ async def create_expense(
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Failed to create expense: {str(e)}")
 
+@router.post("/expenses/bulk", response_model=dict, status_code=status.HTTP_201_CREATED)
+def create_expenses_bulk(
+    expenses: List[ExpenseCreate],
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Create many expenses (without attachments) in a single transaction."""
+    if not expenses:
+        raise HTTPException(status_code=400, detail="No expenses provided")
+    if len(expenses) > MAX_BULK_EXPENSES:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BULK_EXPENSES} expenses per request")
+    
+    # Same rules validate_expense_data applies to single creates
+    now = datetime.now(timezone.utc)
+    for index, expense in enumerate(expenses):
+        expense_date = expense.date if expense.date.tzinfo else expense.date.replace(tzinfo=timezone.utc)
+        if expense_date > now:
+            raise HTTPException(status_code=400, detail=f"Expense {index}: Date cannot be in the future")
+        if not expense.description or expense.description.strip() == '':
+            raise HTTPException(status_code=400, detail=f"Expense {index}: Description is required")
+    
+    try:
+        # Bulk rows carry no upload, so a client-supplied attachment_path is never stored
+        created_ids = bulk_insert_expenses(
+            db, [expense.model_dump(exclude={"attachment_path"}) for expense in expenses]
+        )
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=400, detail="Database integrity error - check referenced entities")
+    
+    return {
+        "message": f"{len(created_ids)} expenses created successfully",
+        "status": "success",
+        "created_ids": created_ids
+    }
+
 @router.get("/expenses/", response_model=List[dict])
-async def read_expenses(
+def read_expenses(
     company: Optional[CompanyEnum] = None,
     category: Optional[ExpenseCategoryEnum] = None,
     skip: int = 0,
     limit: int = 100,
+    before_date: Optional[datetime] = None,
+    before_id: Optional[int] = None,
+    include_total: bool = False,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """
     Get all expenses with optional filtering by company and category.
     Returns expenses with relationships serialized for frontend compatibility.
+    For deep pages pass the last item's date and id as before_date/before_id
+    (keyset pagination) instead of a growing skip.
+    With include_total the number of matching expenses is returned in the
+    X-Total-Count header, computed in the same query as the page.
     """
-    expenses = get_expenses_with_relationships(db, company, category, skip, limit)
-    return [serialize_expense_with_relationships(expense) for expense in expenses]
+    if (before_date is None) != (before_id is None):
+        raise HTTPException(status_code=400, detail="before_date and before_id must be given together")
+    before = (before_date, before_id) if before_id is not None else None
+    if include_total:
+        expenses, total = get_expenses_with_total(db, company, category, skip, limit, before)
+        return serialize_list_response(EXPENSE_LIST_ADAPTER, expenses, headers={"X-Total-Count": str(total)})
+    expenses = get_expenses_with_relationships(db, company, category, skip, limit, before)
+    return serialize_list_response(EXPENSE_LIST_ADAPTER, expenses)
+
+@router.get("/expenses/stream")
+def stream_expenses(
+    company: Optional[CompanyEnum] = None,
+    category: Optional[ExpenseCategoryEnum] = None,
+    session_factory: sessionmaker = Depends(get_session_factory),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Stream every matching expense as newline-delimited JSON, newest first.
+    Rows are fetched in batches with yield_per, so memory stays flat for exports
+    of the whole table and the first line is sent before the last row is read.
+    The generator owns its session, since the body is sent after the handler returns.
+    """
+    def generate():
+        with session_factory() as db:
+            query = filtered_expenses_query(db, company, category).yield_per(EXPENSE_STREAM_BATCH)
+            for expense in query:
+                yield ExpenseListItem.model_validate(expense).model_dump_json().encode() + b"\n"
+    
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
 
 @router.get("/expenses/{expense_id}", response_model=dict)
 def read_expense(
@@ -232,20 +465,23 @@ def read_expense(
     if expense is None:
         raise HTTPException(status_code=404, detail="Expense not found")
     
-    return serialize_expense_with_relationships(expense)
+    return ORJSONResponse(serialize_expense_with_relationships(expense))
 
 @router.put("/expenses/{expense_id}", response_model=dict)
-async def update_expense(
+def update_expense(
     expense_id: int,
+    background_tasks: BackgroundTasks,
     expense_data: str = Form(...),
     attachment: Optional[UploadFile] = File(None),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Update an expense by ID with optional file attachment."""
-    db_expense = get_expense_with_relationships(db, expense_id)
-    if db_expense is None:
+    # Only the current attachment path is needed before the write
+    existing = get_attachment_path_row(db, expense_id)
+    if existing is None:
         raise HTTPException(status_code=404, detail="Expense not found")
+    current_attachment_path = existing.attachment_path
     
     try:
         # Parse JSON data from form
@@ -259,29 +495,36 @@ async def update_expense(
         raise HTTPException(status_code=400, detail=f"Invalid expense data: {str(e)}")
     
     try:
-        # Handle file upload if provided
+        # Handle file upload if provided; a replaced or removed file is only
+        # unlinked after the response, once the update has committed
+        stale_attachment_path = None
         if attachment:
-            # Delete old attachment if it exists
-            if db_expense.attachment_path:
-                file_handler.delete_file(db_expense.attachment_path)
+            # Replace old attachment if it exists
+            stale_attachment_path = current_attachment_path
             
             # Save new attachment
-            attachment_path = await file_handler.save_file(attachment)
+            attachment_path = file_handler.save_file(attachment)
             expense.attachment_path = attachment_path
         elif attachment is None and 'attachment_path' not in expense_dict:
             # If no file provided and no attachment_path in data, remove existing attachment
-            if db_expense.attachment_path:
-                file_handler.delete_file(db_expense.attachment_path)
+            if current_attachment_path:
+                stale_attachment_path = current_attachment_path
                 expense.attachment_path = None
         
-        # Update expense
+        # Update expense in a single UPDATE statement; unchanged rows are left alone
         update_data = expense.model_dump(exclude_unset=True)
-        for field, value in update_data.items():
-            setattr(db_expense, field, value)
-        
-        db.commit()
-        db.refresh(db_expense)
+        if update_data:
+            result = db.execute(
+                update(Expense)
+                .where(Expense.id == expense_id, values_changed(Expense, update_data))
+                .values(**update_data)
+            )
+            if result.rowcount:
+                db.commit()
+        if stale_attachment_path:
+            background_tasks.add_task(file_handler.delete_file, stale_attachment_path)
         
+        db_expense = get_expense_with_relationships(db, expense_id)
         response_data = serialize_expense_with_relationships(db_expense)
         response_data["message"] = "Expense updated successfully"
         response_data["status"] = "success"
@@ -297,22 +540,25 @@ async def update_expense(
 @router.delete("/expenses/{expense_id}", response_model=dict)
 def delete_expense(
     expense_id: int,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Delete an expense by ID with confirmation message."""
-    expense = db.query(Expense).filter(Expense.id == expense_id).first()
-    if expense is None:
+    # One DELETE ... RETURNING both checks existence and hands back the file to clean up
+    deleted = db.execute(
+        delete(Expense).where(Expense.id == expense_id).returning(Expense.attachment_path)
+    ).first()
+    if deleted is None:
         raise HTTPException(status_code=404, detail="Expense not found")
     
     try:
-        # Delete associated file if it exists
-        if expense.attachment_path:
-            file_handler.delete_file(expense.attachment_path)
-        
-        db.delete(expense)
         db.commit()
         
+        # Delete associated file, if any, after the response is sent
+        if deleted.attachment_path:
+            background_tasks.add_task(file_handler.delete_file, deleted.attachment_path)
+        
         return {
             "message": f"Expense with ID {expense_id} deleted successfully", 
             "status": "success",
@@ -324,13 +570,13 @@ def delete_expense(
         raise HTTPException(status_code=500, detail=f"Failed to delete expense: {str(e)}")
 
 @router.get("/expenses/{expense_id}/attachment")
-async def download_attachment(
+def download_attachment(
     expense_id: int,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Download expense attachment file."""
-    expense = db.query(Expense).filter(Expense.id == expense_id).first()
+    expense = get_attachment_path_row(db, expense_id)
     if expense is None:
         raise HTTPException(status_code=404, detail="Expense not found")
     
@@ -338,7 +584,12 @@ async def download_attachment(
         raise HTTPException(status_code=404, detail="No attachment found for this expense")
     
     file_path = file_handler.get_absolute_path(expense.attachment_path)
-    if not file_path or not file_path.exists():
+    try:
+        # One stat serves both the existence check and FileResponse's headers
+        stat_result = file_path.stat() if file_path else None
+    except OSError:
+        stat_result = None
+    if stat_result is None:
         raise HTTPException(status_code=404, detail="Attachment file not found")
     
     # Get the original filename from the path
@@ -347,31 +598,32 @@ async def download_attachment(
     return FileResponse(
         path=str(file_path),
         filename=filename,
-        media_type='application/octet-stream'
+        media_type='application/octet-stream',
+        stat_result=stat_result
     )
 
 @router.delete("/expenses/{expense_id}/attachment", status_code=status.HTTP_204_NO_CONTENT)
-async def remove_attachment(
+def remove_attachment(
     expense_id: int,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Remove attachment from expense."""
-    expense = db.query(Expense).filter(Expense.id == expense_id).first()
+    expense = db.get(Expense, expense_id)
     if expense is None:
         raise HTTPException(status_code=404, detail="Expense not found")
     
     if not expense.attachment_path:
         raise HTTPException(status_code=404, detail="No attachment found for this expense")
     
-    # Delete the file
-    file_handler.delete_file(expense.attachment_path)
-    
-    # Remove path from database
+    # Remove path from database, then delete the file after the response is sent
+    attachment_path = expense.attachment_path
     expense.attachment_path = None
     db.commit()
+    background_tasks.add_task(file_handler.delete_file, attachment_path)
     
-    return
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
 
 # Business Unit endpoints
 @router.post("/business-units/", response_model=dict, status_code=status.HTTP_201_CREATED)
@@ -381,41 +633,21 @@ def create_business_unit(
     current_user: User = Depends(get_current_active_user)
 ):
     """Create a new business unit with duplicate checking."""
-    # Check for duplicate name
-    if check_duplicate_entity(db, BusinessUnit, "name", business_unit.name):
-        raise HTTPException(status_code=400, detail=f"Business unit with name '{business_unit.name}' already exists")
-    
-    try:
-        db_business_unit = BusinessUnit(**business_unit.model_dump())
-        db.add(db_business_unit)
-        db.commit()
-        db.refresh(db_business_unit)
-        
-        return {
-            **business_unit.model_dump(),
-            "id": db_business_unit.id,
-            "created_at": db_business_unit.created_at,
-            "updated_at": db_business_unit.updated_at,
-            "message": "Business unit created successfully",
-            "status": "success"
-        }
-        
-    except IntegrityError as e:
-        db.rollback()
-        raise HTTPException(status_code=400, detail="Business unit name must be unique")
-    except Exception as e:
-        db.rollback()
-        raise HTTPException(status_code=500, detail=f"Failed to create business unit: {str(e)}")
+    return create_entity(db, BusinessUnit, business_unit.model_dump(), "name", "Business unit")
 
 @router.get("/business-units/", response_model=List[BusinessUnitSchema])
-async def read_business_units(
+def read_business_units(
+    request: Request,
     skip: int = 0,
     limit: int = 100,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    business_units = db.query(BusinessUnit).offset(skip).limit(limit).all()
-    return business_units
+    stmt = (
+        select(BusinessUnit.id, BusinessUnit.name, BusinessUnit.created_at, BusinessUnit.updated_at)
+        .order_by(BusinessUnit.id).offset(skip).limit(limit)
+    )
+    return serialize_rows_response(db, stmt, request)
 
 @router.put("/business-units/{business_unit_id}", response_model=BusinessUnitSchema)
 def update_business_unit(
@@ -424,16 +656,7 @@ def update_business_unit(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    db_business_unit = db.query(BusinessUnit).filter(BusinessUnit.id == business_unit_id).first()
-    if not db_business_unit:
-        raise HTTPException(status_code=404, detail="Business unit not found")
-    
-    for key, value in business_unit.model_dump().items():
-        setattr(db_business_unit, key, value)
-    
-    db.commit()
-    db.refresh(db_business_unit)
-    return db_business_unit
+    return update_entity(db, BusinessUnit, business_unit_id, business_unit.model_dump(), "Business unit")
 
 @router.delete("/business-units/{business_unit_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_business_unit(
@@ -442,11 +665,8 @@ def delete_business_unit(
     current_user: User = Depends(get_current_active_user)
 ):
     """Delete a business unit if not referenced by expenses."""
-    business_unit = db.query(BusinessUnit).filter(BusinessUnit.id == business_unit_id).first()
-    if not business_unit:
-        raise HTTPException(status_code=404, detail="Business unit not found")
-    
-    check_entity_usage_and_delete(db, business_unit, business_unit_id, "business_unit")
+    delete_unreferenced_entity(db, BusinessUnit, business_unit_id, "business_unit", "Business unit")
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
 
 # Truck endpoints
 @router.post("/trucks/", response_model=dict, status_code=status.HTTP_201_CREATED)
@@ -456,41 +676,21 @@ def create_truck(
     current_user: User = Depends(get_current_active_user)
 ):
     """Create a new truck with duplicate number checking."""
-    # Check for duplicate number
-    if check_duplicate_entity(db, Truck, "number", truck.number):
-        raise HTTPException(status_code=400, detail=f"Truck with number '{truck.number}' already exists")
-    
-    try:
-        db_truck = Truck(**truck.model_dump())
-        db.add(db_truck)
-        db.commit()
-        db.refresh(db_truck)
-        
-        return {
-            **truck.model_dump(),
-            "id": db_truck.id,
-            "created_at": db_truck.created_at,
-            "updated_at": db_truck.updated_at,
-            "message": "Truck created successfully",
-            "status": "success"
-        }
-        
-    except IntegrityError as e:
-        db.rollback()
-        raise HTTPException(status_code=400, detail="Truck number must be unique")
-    except Exception as e:
-        db.rollback()
-        raise HTTPException(status_code=500, detail=f"Failed to create truck: {str(e)}")
+    return create_entity(db, Truck, truck.model_dump(), "number", "Truck")
 
 @router.get("/trucks/", response_model=List[TruckSchema])
-async def read_trucks(
+def read_trucks(
+    request: Request,
     skip: int = 0,
     limit: int = 100,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    trucks = db.query(Truck).offset(skip).limit(limit).all()
-    return trucks
+    stmt = (
+        select(Truck.id, Truck.number, Truck.created_at, Truck.updated_at)
+        .order_by(Truck.id).offset(skip).limit(limit)
+    )
+    return serialize_rows_response(db, stmt, request)
 
 @router.put("/trucks/{truck_id}", response_model=TruckSchema)
 def update_truck(
@@ -499,16 +699,7 @@ def update_truck(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    db_truck = db.query(Truck).filter(Truck.id == truck_id).first()
-    if not db_truck:
-        raise HTTPException(status_code=404, detail="Truck not found")
-    
-    for key, value in truck.model_dump().items():
-        setattr(db_truck, key, value)
-    
-    db.commit()
-    db.refresh(db_truck)
-    return db_truck
+    return update_entity(db, Truck, truck_id, truck.model_dump(), "Truck")
 
 @router.delete("/trucks/{truck_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_truck(
@@ -517,11 +708,8 @@ def delete_truck(
     current_user: User = Depends(get_current_active_user)
 ):
     """Delete a truck if not referenced by expenses."""
-    truck = db.query(Truck).filter(Truck.id == truck_id).first()
-    if not truck:
-        raise HTTPException(status_code=404, detail="Truck not found")
-    
-    check_entity_usage_and_delete(db, truck, truck_id, "truck")
+    delete_unreferenced_entity(db, Truck, truck_id, "truck", "Truck")
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
 
 # Trailer endpoints
 @router.post("/trailers/", response_model=dict, status_code=status.HTTP_201_CREATED)
@@ -531,41 +719,21 @@ def create_trailer(
     current_user: User = Depends(get_current_active_user)
 ):
     """Create a new trailer with duplicate number checking."""
-    # Check for duplicate number
-    if check_duplicate_entity(db, Trailer, "number", trailer.number):
-        raise HTTPException(status_code=400, detail=f"Trailer with number '{trailer.number}' already exists")
-    
-    try:
-        db_trailer = Trailer(**trailer.model_dump())
-        db.add(db_trailer)
-        db.commit()
-        db.refresh(db_trailer)
-        
-        return {
-            **trailer.model_dump(),
-            "id": db_trailer.id,
-            "created_at": db_trailer.created_at,
-            "updated_at": db_trailer.updated_at,
-            "message": "Trailer created successfully",
-            "status": "success"
-        }
-        
-    except IntegrityError as e:
-        db.rollback()
-        raise HTTPException(status_code=400, detail="Trailer number must be unique")
-    except Exception as e:
-        db.rollback()
-        raise HTTPException(status_code=500, detail=f"Failed to create trailer: {str(e)}")
+    return create_entity(db, Trailer, trailer.model_dump(), "number", "Trailer")
 
 @router.get("/trailers/", response_model=List[TrailerSchema])
-async def read_trailers(
+def read_trailers(
+    request: Request,
     skip: int = 0,
     limit: int = 100,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    trailers = db.query(Trailer).offset(skip).limit(limit).all()
-    return trailers
+    stmt = (
+        select(Trailer.id, Trailer.number, Trailer.created_at, Trailer.updated_at)
+        .order_by(Trailer.id).offset(skip).limit(limit)
+    )
+    return serialize_rows_response(db, stmt, request)
 
 @router.put("/trailers/{trailer_id}", response_model=TrailerSchema)
 def update_trailer(
@@ -574,16 +742,7 @@ def update_trailer(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    db_trailer = db.query(Trailer).filter(Trailer.id == trailer_id).first()
-    if not db_trailer:
-        raise HTTPException(status_code=404, detail="Trailer not found")
-    
-    for key, value in trailer.model_dump().items():
-        setattr(db_trailer, key, value)
-    
-    db.commit()
-    db.refresh(db_trailer)
-    return db_trailer
+    return update_entity(db, Trailer, trailer_id, trailer.model_dump(), "Trailer")
 
 @router.delete("/trailers/{trailer_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_trailer(
@@ -592,11 +751,8 @@ def delete_trailer(
     current_user: User = Depends(get_current_active_user)
 ):
     """Delete a trailer if not referenced by expenses."""
-    trailer = db.query(Trailer).filter(Trailer.id == trailer_id).first()
-    if not trailer:
-        raise HTTPException(status_code=404, detail="Trailer not found")
-    
-    check_entity_usage_and_delete(db, trailer, trailer_id, "trailer")
+    delete_unreferenced_entity(db, Trailer, trailer_id, "trailer", "Trailer")
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
 
 # Fuel Station endpoints
 @router.post("/fuel-stations/", response_model=dict, status_code=status.HTTP_201_CREATED)
@@ -606,41 +762,21 @@ def create_fuel_station(
     current_user: User = Depends(get_current_active_user)
 ):
     """Create a new fuel station with duplicate name checking."""
-    # Check for duplicate name
-    if check_duplicate_entity(db, FuelStation, "name", fuel_station.name):
-        raise HTTPException(status_code=400, detail=f"Fuel station with name '{fuel_station.name}' already exists")
-    
-    try:
-        db_fuel_station = FuelStation(**fuel_station.model_dump())
-        db.add(db_fuel_station)
-        db.commit()
-        db.refresh(db_fuel_station)
-        
-        return {
-            **fuel_station.model_dump(),
-            "id": db_fuel_station.id,
-            "created_at": db_fuel_station.created_at,
-            "updated_at": db_fuel_station.updated_at,
-            "message": "Fuel station created successfully",
-            "status": "success"
-        }
-        
-    except IntegrityError as e:
-        db.rollback()
-        raise HTTPException(status_code=400, detail="Fuel station name must be unique")
-    except Exception as e:
-        db.rollback()
-        raise HTTPException(status_code=500, detail=f"Failed to create fuel station: {str(e)}")
+    return create_entity(db, FuelStation, fuel_station.model_dump(), "name", "Fuel station")
 
 @router.get("/fuel-stations/", response_model=List[FuelStationSchema])
-async def read_fuel_stations(
+def read_fuel_stations(
+    request: Request,
     skip: int = 0,
     limit: int = 100,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    fuel_stations = db.query(FuelStation).offset(skip).limit(limit).all()
-    return fuel_stations
+    stmt = (
+        select(FuelStation.id, FuelStation.name, FuelStation.created_at, FuelStation.updated_at)
+        .order_by(FuelStation.id).offset(skip).limit(limit)
+    )
+    return serialize_rows_response(db, stmt, request)
 
 @router.put("/fuel-stations/{fuel_station_id}", response_model=FuelStationSchema)
 def update_fuel_station(
@@ -649,16 +785,7 @@ def update_fuel_station(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    db_fuel_station = db.query(FuelStation).filter(FuelStation.id == fuel_station_id).first()
-    if not db_fuel_station:
-        raise HTTPException(status_code=404, detail="Fuel station not found")
-    
-    for key, value in fuel_station.model_dump().items():
-        setattr(db_fuel_station, key, value)
-    
-    db.commit()
-    db.refresh(db_fuel_station)
-    return db_fuel_station
+    return update_entity(db, FuelStation, fuel_station_id, fuel_station.model_dump(), "Fuel station")
 
 @router.delete("/fuel-stations/{fuel_station_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_fuel_station(
@@ -667,11 +794,43 @@ def delete_fuel_station(
     current_user: User = Depends(get_current_active_user)
 ):
     """Delete a fuel station if not referenced by expenses."""
-    fuel_station = db.query(FuelStation).filter(FuelStation.id == fuel_station_id).first()
-    if not fuel_station:
-        raise HTTPException(status_code=404, detail="Fuel station not found")
+    delete_unreferenced_entity(db, FuelStation, fuel_station_id, "fuel_station", "Fuel station")
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+def trailing_months(now: datetime, count: int = 6) -> List[Tuple[int, int]]:
+    """(year, month) pairs for the last `count` months including the current one, oldest first."""
+    months = []
+    for i in range(count - 1, -1, -1):
+        if now.month - i <= 0:
+            months.append((now.year - 1, 12 + (now.month - i)))
+        else:
+            months.append((now.year, now.month - i))
+    return months
+
+def monthly_totals(db: Session, company: CompanyEnum, months: List[Tuple[int, int]],
+                   categories: Optional[list] = None) -> dict:
+    """
+    Sum a company's expenses per calendar month over the given months in one GROUP BY.
+    Keys are (year, month), or (category, year, month) when categories are given;
+    months without expenses are absent.
+    """
+    first_year, first_month = months[0]
+    last_year, last_month = months[-1]
+    # Half-open window [first month, month after last) so no sub-second tail is lost
+    window_start = datetime(first_year, first_month, 1)
+    window_end = datetime(last_year + (last_month == 12), last_month % 12 + 1, 1)
     
-    check_entity_usage_and_delete(db, fuel_station, fuel_station_id, "fuel_station")
+    keys = [extract('year', Expense.date), extract('month', Expense.date)]
+    if categories is not None:
+        keys.insert(0, Expense.category)
+    query = db.query(*keys, func.sum(Expense.price)).filter(
+        Expense.company == company,
+        Expense.date >= window_start,
+        Expense.date < window_end
+    )
+    if categories is not None:
+        query = query.filter(Expense.category.in_(categories))
+    return {tuple(row[:-1]): row[-1] for row in query.group_by(*keys)}
 
 # Analytics endpoints
 @router.get("/analytics/monthly-change/{company}")
@@ -684,34 +843,11 @@ def get_monthly_change(
     try:
         now = datetime.now()
         
-        # Current month
-        current_month_start = datetime(now.year, now.month, 1)
-        current_month_end = datetime(now.year, now.month, monthrange(now.year, now.month)[1], 23, 59, 59)
-        
-        # Previous month
-        if now.month == 1:
-            prev_month = 12
-            prev_year = now.year - 1
-        else:
-            prev_month = now.month - 1
-            prev_year = now.year
-        
-        prev_month_start = datetime(prev_year, prev_month, 1)
-        prev_month_end = datetime(prev_year, prev_month, monthrange(prev_year, prev_month)[1], 23, 59, 59)
-        
-        # Calculate current month total
-        current_total = db.query(func.sum(Expense.price)).filter(
-            Expense.company == company,
-            Expense.date >= current_month_start,
-            Expense.date <= current_month_end
-        ).scalar() or 0
-        
-        # Calculate previous month total
-        prev_total = db.query(func.sum(Expense.price)).filter(
-            Expense.company == company,
-            Expense.date >= prev_month_start,
-            Expense.date <= prev_month_end
-        ).scalar() or 0
+        # Current, previous and trend months all come from one grouped query
+        months = trailing_months(now)
+        totals = monthly_totals(db, company, months)
+        current_total = totals.get(months[-1], 0)
+        prev_total = totals.get(months[-2], 0)
         
         # Calculate percentage change
         if prev_total > 0:
@@ -720,28 +856,13 @@ def get_monthly_change(
             percentage_change = 0 if current_total == 0 else 100
         
         # Get monthly data for the last 6 months for trend
-        monthly_data = []
-        for i in range(5, -1, -1):  # Last 6 months including current
-            if now.month - i <= 0:
-                month = 12 + (now.month - i)
-                year = now.year - 1
-            else:
-                month = now.month - i
-                year = now.year
-            
-            month_start = datetime(year, month, 1)
-            month_end = datetime(year, month, monthrange(year, month)[1], 23, 59, 59)
-            
-            month_total = db.query(func.sum(Expense.price)).filter(
-                Expense.company == company,
-                Expense.date >= month_start,
-                Expense.date <= month_end
-            ).scalar() or 0
-            
-            monthly_data.append({
+        monthly_data = [
+            {
                 "month": datetime(year, month, 1).strftime('%b %Y'),
-                "total": float(month_total)
-            })
+                "total": float(totals.get((year, month), 0))
+            }
+            for year, month in months
+        ]
         
         return {
             "current_month": float(current_total),
@@ -774,35 +895,22 @@ def get_top_categories(
             Expense.date >= six_months_ago
         ).group_by(Expense.category).order_by(func.sum(Expense.price).desc()).limit(3).all()
         
-        # Get monthly trends for each top category
+        # Get monthly trends for all top categories in one grouped query
+        months = trailing_months(now)
+        month_labels = [datetime(year, month, 1).strftime('%b %Y') for year, month in months]
+        totals = monthly_totals(db, company, months, [row.category for row in category_totals])
+        
         top_categories_data = []
         for category_total in category_totals:
             category = category_total.category
             
-            # Get monthly data for this category
-            monthly_data = []
-            for i in range(5, -1, -1):  # Last 6 months including current
-                if now.month - i <= 0:
-                    month = 12 + (now.month - i)
-                    year = now.year - 1
-                else:
-                    month = now.month - i
-                    year = now.year
-                
-                month_start = datetime(year, month, 1)
-                month_end = datetime(year, month, monthrange(year, month)[1], 23, 59, 59)
-                
-                month_total = db.query(func.sum(Expense.price)).filter(
-                    Expense.company == company,
-                    Expense.category == category,
-                    Expense.date >= month_start,
-                    Expense.date <= month_end
-                ).scalar() or 0
-                
-                monthly_data.append({
-                    "month": datetime(year, month, 1).strftime('%b %Y'),
-                    "amount": float(month_total)
-                })
+            monthly_data = [
+                {
+                    "month": label,
+                    "amount": float(totals.get((category, year, month), 0))
+                }
+                for (year, month), label in zip(months, month_labels)
+            ]
             
             # Format category name for display
             category_display = category.replace('-', ' ').title()
@@ -821,199 +929,231 @@ def get_top_categories(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Analytics failed: {str(e)}")
 
+# Sheet columns per category in export order
+EXPORT_CATEGORIES = {
+    'truck': ['Date', 'Business Unit', 'Truck Number', 'Description', 'Price ($)'],
+    'trailer': ['Date', 'Business Unit', 'Trailer Number', 'Description', 'Price ($)'],
+    'dmv': ['Date', 'Description', 'Price ($)'],
+    'parts': ['Date', 'Description', 'Price ($)'],
+    'phone-tracker': ['Date', 'Description', 'Price ($)'],
+    'other-expenses': ['Date', 'Description', 'Price ($)'],
+    'toll': ['Date', 'Price ($)'],
+    'office-supplies': ['Date', 'Description', 'Price ($)'],
+    'fuel-diesel': ['Date', 'Fuel Station', 'Gallons', 'Price ($)'],
+    'def': ['Date', 'Price ($)']
+}
+# Columns whose longest value sizes each export sheet column, with the relationship
+# to outer-join for it; Date is always YYYY-MM-DD
+EXPORT_FIELD_SOURCES = {
+    'Business Unit': (BusinessUnit.name, Expense.business_unit),
+    'Truck Number': (Truck.number, Expense.truck),
+    'Trailer Number': (Trailer.number, Expense.trailer),
+    'Description': (Expense.description, None),
+    'Fuel Station': (FuelStation.name, Expense.fuel_station),
+    'Gallons': (Expense.gallons, None),
+    'Price ($)': (Expense.price, None),
+}
+EXPORT_DATE_WIDTH = len('YYYY-MM-DD')
+EXPORT_MAX_COLUMN_WIDTH = 30
+# Rows fetched per batch while writing the export
+EXPORT_BATCH = 1000
+# Exports are built in memory up to this size, then spill to disk
+EXPORT_SPOOL_SIZE = 32 * 1024 * 1024
+CURRENCY_FORMAT = '"$"#,##0.00'
+XLSX_MEDIA_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+def fitted_widths(fields: List[str], value_lengths: List[int]) -> List[int]:
+    """Column widths fitting the header and longest value, with padding, capped at 30."""
+    return [
+        min(max(len(field), length or 0) + 2, EXPORT_MAX_COLUMN_WIDTH)
+        for field, length in zip(fields, value_lengths)
+    ]
+
+def export_column_widths(db: Session, company: CompanyEnum, category: str, fields: List[str]) -> List[int]:
+    """
+    Fit a category sheet's columns to their longest values.
+    Write-only sheets take widths before the first row, so the lengths come from one
+    aggregate query rather than a second pass over the written cells.
+    """
+    lengths = []
+    joins = []
+    for field in fields:
+        if field == 'Date':
+            continue
+        column, relationship = EXPORT_FIELD_SOURCES[field]
+        lengths.append(func.max(func.length(cast(column, String))))
+        if relationship is not None:
+            joins.append(relationship)
+    
+    query = db.query(*lengths).select_from(Expense)
+    for relationship in joins:
+        query = query.outerjoin(relationship)
+    row = iter(query.filter(Expense.company == company, Expense.category == category).one())
+    
+    value_lengths = [EXPORT_DATE_WIDTH if field == 'Date' else next(row) for field in fields]
+    return fitted_widths(fields, value_lengths)
+
+def new_export_sheet(wb: Workbook, title: str, fields: List[str], widths: List[int], **header_style):
+    """Create a write-only sheet with the given column widths and a styled header row."""
+    ws = wb.create_sheet(title=title)
+    for col, width in enumerate(widths, 1):
+        ws.column_dimensions[get_column_letter(col)].width = width
+    header = []
+    for field in fields:
+        cell = WriteOnlyCell(ws, value=field)
+        for name, style in header_style.items():
+            setattr(cell, name, style)
+        header.append(cell)
+    ws.append(header)
+    return ws
+
+def export_row(ws, expense: Expense, category: str) -> list:
+    """Build one category sheet row, matching that category's EXPORT_CATEGORIES columns."""
+    row = [expense.date.strftime('%Y-%m-%d') if expense.date else '']
+    
+    # Category specific fields
+    if category in ['truck', 'trailer']:
+        row.append(expense.business_unit.name if expense.business_unit else '')
+        if category == 'truck':
+            row.append(expense.truck.number if expense.truck else '')
+        else:
+            row.append(expense.trailer.number if expense.trailer else '')
+        # Description (use only description)
+        row.append(expense.description or '')
+    elif category == 'fuel-diesel':
+        row.append(expense.fuel_station.name if expense.fuel_station else '')
+        row.append(expense.gallons or '')
+    elif category not in ['toll', 'def']:
+        # Description for categories that have it
+        row.append(expense.description or '')
+    
+    # Price (always last column) - format as currency
+    price_cell = WriteOnlyCell(ws, value=float(expense.price) if expense.price else 0)
+    price_cell.number_format = CURRENCY_FORMAT
+    row.append(price_cell)
+    return row
+
+def iter_file(file, chunk_size: int = 64 * 1024):
+    """Yield a file's contents from the start in chunks, closing it when done."""
+    with file:
+        file.seek(0)
+        while chunk := file.read(chunk_size):
+            yield chunk
+
 @router.get("/export/{company}")
 def export_company_data(
     company: CompanyEnum,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    """Export all expense data for a company to Excel format."""
+    """
+    Export all expense data for a company to Excel format.
+    The workbook is written in write-only mode from batched queries, so memory stays
+    flat however many expenses the company has.
+    """
     try:
-        # Get all expenses for the company with relationships
-        expenses = db.query(Expense).options(
-            joinedload(Expense.business_unit),
-            joinedload(Expense.truck),
-            joinedload(Expense.trailer),
-            joinedload(Expense.fuel_station)
-        ).filter(Expense.company == company).order_by(Expense.date.desc()).all()
+        # Summary first: it decides which category sheets exist, and write-only
+        # sheets must be created in display order. Newest activity first.
+        category_totals = db.query(
+            Expense.category,
+            func.count(Expense.id).label('count'),
+            func.sum(Expense.price).label('total')
+        ).filter(Expense.company == company).group_by(Expense.category).order_by(
+            func.max(Expense.date).desc()
+        ).all()
 
         # Create Excel workbook
-        wb = Workbook()
+        wb = Workbook(write_only=True)
         
-        # Remove default sheet
-        wb.remove(wb.active)
+        # Style for headers
+        header_font = Font(bold=True, color='FFFFFF')
+        header_fill = PatternFill(start_color='366092', end_color='366092', fill_type='solid')
+        header_alignment = Alignment(horizontal='center', vertical='center')
         
-        # Define expense categories and their fields
-        categories = {
-            'truck': ['Date', 'Business Unit', 'Truck Number', 'Description', 'Price ($)'],
-            'trailer': ['Date', 'Business Unit', 'Trailer Number', 'Description', 'Price ($)'],
-            'dmv': ['Date', 'Description', 'Price ($)'],
-            'parts': ['Date', 'Description', 'Price ($)'],
-            'phone-tracker': ['Date', 'Description', 'Price ($)'],
-            'other-expenses': ['Date', 'Description', 'Price ($)'],
-            'toll': ['Date', 'Price ($)'],
-            'office-supplies': ['Date', 'Description', 'Price ($)'],
-            'fuel-diesel': ['Date', 'Fuel Station', 'Gallons', 'Price ($)'],
-            'def': ['Date', 'Price ($)']
-        }
-        
-        # Create a sheet for each category that has data
-        for category, fields in categories.items():
-            category_expenses = [e for e in expenses if e.category == category]
-            if not category_expenses:
-                continue
-                
-            # Create worksheet
-            ws = wb.create_sheet(title=category.replace('-', ' ').title())
-            
-            # Style for headers
-            header_font = Font(bold=True, color='FFFFFF')
-            header_fill = PatternFill(start_color='366092', end_color='366092', fill_type='solid')
-            header_alignment = Alignment(horizontal='center', vertical='center')
-            
-            # Add headers
-            for col, field in enumerate(fields, 1):
-                cell = ws.cell(row=1, column=col, value=field)
-                cell.font = header_font
-                cell.fill = header_fill
-                cell.alignment = header_alignment
+        # Create summary sheet
+        if category_totals:
+            # At most one row per category, so the rows are built up front to size the columns
+            summary_rows = [
+                (category.replace('-', ' ').title(), count, float(total or 0))
+                for category, count, total in category_totals
+            ]
+            grand_total_values = (
+                'GRAND TOTAL',
+                sum(row[1] for row in summary_rows),
+                sum(row[2] for row in summary_rows)
+            )
+            summary_fields = ['Category', 'Total Expenses', 'Total Price ($)']
+            summary_lengths = [
+                max(len(str(row[col])) for row in summary_rows + [grand_total_values])
+                for col in range(len(summary_fields))
+            ]
+            summary_ws = new_export_sheet(
+                wb, 'Summary', summary_fields, fitted_widths(summary_fields, summary_lengths),
+                font=header_font, fill=header_fill
+            )
             
-            # Add data rows
-            for row, expense in enumerate(category_expenses, 2):
-                col = 1
-                
-                # Date
-                ws.cell(row=row, column=col, value=expense.date.strftime('%Y-%m-%d') if expense.date else '')
-                col += 1
-                
-                # Category specific fields
-                if category in ['truck', 'trailer']:
-                    # Business Unit
-                    ws.cell(row=row, column=col, value=expense.business_unit.name if expense.business_unit else '')
-                    col += 1
-                    # Truck/Trailer Number
-                    if category == 'truck':
-                        ws.cell(row=row, column=col, value=expense.truck.number if expense.truck else '')
-                    else:
-                        ws.cell(row=row, column=col, value=expense.trailer.number if expense.trailer else '')
-                    col += 1
-                    # Description (use only description)
-                    ws.cell(row=row, column=col, value=expense.description or '')
-                    col += 1
-                    
-                elif category == 'fuel-diesel':
-                    # Fuel Station
-                    ws.cell(row=row, column=col, value=expense.fuel_station.name if expense.fuel_station else '')
-                    col += 1
-                    
-                    # Gallons
-                    ws.cell(row=row, column=col, value=expense.gallons or '')
-                    col += 1
-                    
-                elif category not in ['toll', 'def']:
-                    # Description for categories that have it
-                    ws.cell(row=row, column=col, value=expense.description or '')
-                    col += 1
-                
-                # Price (always last column) - format as currency
-                price_cell = ws.cell(row=row, column=col, value=float(expense.price) if expense.price else 0)
-                price_cell.number_format = '"$"#,##0.00'
+            for label, count, total in summary_rows:
+                total_cell = WriteOnlyCell(summary_ws, value=total)
+                total_cell.number_format = CURRENCY_FORMAT
+                summary_ws.append([label, count, total_cell])
             
-            # Auto-adjust column widths
-            for column in ws.columns:
-                max_length = 0
-                column_letter = column[0].column_letter
-                for cell in column:
-                    try:
-                        if len(str(cell.value)) > max_length:
-                            max_length = len(str(cell.value))
-                    except:
-                        pass
-                adjusted_width = min(max_length + 2, 30)
-                ws.column_dimensions[column_letter].width = adjusted_width
+            # Add grand total after a blank row
+            summary_ws.append([])
+            bold = Font(bold=True)
+            grand_total_row = [WriteOnlyCell(summary_ws, value=value) for value in grand_total_values]
+            for cell in grand_total_row:
+                cell.font = bold
+            grand_total_row[2].number_format = CURRENCY_FORMAT
+            summary_ws.append(grand_total_row)
         
-        # Create summary sheet
-        if expenses:
-            summary_ws = wb.create_sheet(title='Summary', index=0)
-            
-            # Headers
-            summary_ws.cell(row=1, column=1, value='Category').font = header_font
-            summary_ws.cell(row=1, column=1).fill = header_fill
-            summary_ws.cell(row=1, column=2, value='Total Expenses').font = header_font
-            summary_ws.cell(row=1, column=2).fill = header_fill
-            summary_ws.cell(row=1, column=3, value='Total Price ($)').font = header_font
-            summary_ws.cell(row=1, column=3).fill = header_fill
+        # Create a sheet for each category that has data
+        present = {row.category for row in category_totals}
+        for category, fields in EXPORT_CATEGORIES.items():
+            if category not in present:
+                continue
             
-            # Calculate summary data
-            category_totals = {}
+            ws = new_export_sheet(
+                wb, category.replace('-', ' ').title(), fields,
+                export_column_widths(db, company, category, fields),
+                font=header_font, fill=header_fill, alignment=header_alignment
+            )
+            expenses = db.query(Expense).options(
+                # Only the columns export_row writes
+                load_only(Expense.date, Expense.description, Expense.gallons, Expense.price),
+                *EXPENSE_RELATIONSHIP_LOADS,
+                raiseload("*")
+            ).filter(
+                Expense.company == company,
+                Expense.category == category
+            ).order_by(Expense.date.desc()).yield_per(EXPORT_BATCH)
             for expense in expenses:
-                category = expense.category
-                if category not in category_totals:
-                    category_totals[category] = {'count': 0, 'total': 0}
-                category_totals[category]['count'] += 1
-                category_totals[category]['total'] += float(expense.price) if expense.price else 0
-            
-            # Add summary data
-            row = 2
-            grand_total = 0
-            total_expenses = 0
-            for category, data in category_totals.items():
-                summary_ws.cell(row=row, column=1, value=category.replace('-', ' ').title())
-                summary_ws.cell(row=row, column=2, value=data['count'])
-                total_cell = summary_ws.cell(row=row, column=3, value=data['total'])
-                total_cell.number_format = '"$"#,##0.00'
-                grand_total += data['total']
-                total_expenses += data['count']
-                row += 1
-            
-            # Add grand total
-            row += 1
-            summary_ws.cell(row=row, column=1, value='GRAND TOTAL').font = Font(bold=True)
-            summary_ws.cell(row=row, column=2, value=total_expenses).font = Font(bold=True)
-            grand_total_cell = summary_ws.cell(row=row, column=3, value=grand_total)
-            grand_total_cell.font = Font(bold=True)
-            grand_total_cell.number_format = '"$"#,##0.00'
-            
-            # Auto-adjust column widths for summary
-            for column in summary_ws.columns:
-                max_length = 0
-                column_letter = column[0].column_letter
-                for cell in column:
-                    try:
-                        if len(str(cell.value)) > max_length:
-                            max_length = len(str(cell.value))
-                    except:
-                        pass
-                adjusted_width = min(max_length + 2, 30)
-                summary_ws.column_dimensions[column_letter].width = adjusted_width
+                ws.append(export_row(ws, expense, category))
 
         # If no expenses, create an empty summary sheet
         if not wb.worksheets:
             ws = wb.create_sheet(title='No Data')
-            ws.cell(row=1, column=1, value='No expense data found for this company')
+            ws.append(['No expense data found for this company'])
         
-        # Save to temporary file
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.xlsx') as tmp_file:
-            wb.save(tmp_file.name)
-            tmp_file_path = tmp_file.name
+        # Save to a spooled temporary file, removed once the response is sent
+        tmp_file = tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_SIZE)
+        wb.save(tmp_file)
         
         # Generate filename
         company_name = company.value.upper()
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         filename = f"{company_name}_Expenses_Export_{timestamp}.xlsx"
         
-        # Return file response
-        return FileResponse(
-            path=tmp_file_path,
-            filename=filename,
-            media_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+        return StreamingResponse(
+            iter_file(tmp_file),
+            media_type=XLSX_MEDIA_TYPE,
+            headers={"Content-Disposition": f'attachment; filename="{filename}"'}
         )
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Export failed: {str(e)}")
 
 @router.get("/pie-chart-data/{company}")
-async def get_pie_chart_data(
+def get_pie_chart_data(
     company: CompanyEnum,
     period: str = Query("total", pattern="^(this-month|total)$"),
     db: Session = Depends(get_db),
@@ -1024,26 +1164,19 @@ async def get_pie_chart_data(
     Period can be 'this-month' or 'total'.
     """
     try:
-        query = db.query(Expense).filter(Expense.company == company)
+        query = db.query(Expense.category, func.sum(Expense.price)).filter(Expense.company == company)
         
         # Filter by period if specified
         if period == "this-month":
             now = datetime.now()
             start_of_month = datetime(now.year, now.month, 1)
-            query = query.filter(Expense.date >= start_of_month.date())
+            query = query.filter(Expense.date >= start_of_month)
         
-        expenses = query.all()
-        
-        # Group by category and sum costs
-        category_totals = {}
-        for expense in expenses:
-            category = expense.category.value
-            price = float(expense.price or 0)
-            
-            if category in category_totals:
-                category_totals[category] += price
-            else:
-                category_totals[category] = price
+        # Group by category and sum costs in the database
+        category_totals = {
+            category: float(total or 0)
+            for category, total in query.group_by(Expense.category)
+        }
         
         # Convert to pie chart format with default Mantine colors
         category_colors = {
@@ -1,6 +1,6 @@
-from pydantic import BaseModel, Field, field_validator, ConfigDict
+from pydantic import BaseModel, Field, field_validator, ConfigDict, TypeAdapter
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 from ..models.expense import CompanyEnum, ExpenseCategoryEnum
 
 # Base schemas for management entities
@@ -139,3 +139,51 @@ class Expense(ExpenseBase):
     updated_at: Optional[datetime] = None
     
     model_config = ConfigDict(from_attributes=True)
+
+# Flat shapes of the related entities as embedded in expense listings
+class BusinessUnitRef(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+    
+    id: int
+    name: str
+
+class TruckRef(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+    
+    id: int
+    number: str
+
+class TrailerRef(TruckRef):
+    pass
+
+class FuelStationRef(BusinessUnitRef):
+    pass
+
+class ExpenseListItem(BaseModel):
+    """
+    Wire format of GET /expenses/, read straight from ORM rows.
+    Mirrors serialize_expense_with_relationships field for field.
+    """
+    model_config = ConfigDict(from_attributes=True)
+    
+    id: int
+    company: str
+    category: str
+    date: datetime
+    price: float
+    description: Optional[str] = None
+    gallons: Optional[float] = None
+    business_unit_id: Optional[int] = None
+    truck_id: Optional[int] = None
+    trailer_id: Optional[int] = None
+    fuel_station_id: Optional[int] = None
+    attachment_path: Optional[str] = None
+    businessUnit: Optional[BusinessUnitRef] = Field(None, validation_alias="business_unit")
+    truck: Optional[TruckRef] = None
+    trailer: Optional[TrailerRef] = None
+    fuelStation: Optional[FuelStationRef] = Field(None, validation_alias="fuel_station")
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+
+# Pre-built list adapter so the expense listing validates and encodes in a single pydantic-core pass
+EXPENSE_LIST_ADAPTER = TypeAdapter(List[ExpenseListItem])
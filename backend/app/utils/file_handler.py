@@ -12,6 +12,7 @@ class FileHandler:
     
     ALLOWED_EXTENSIONS = {'.pdf', '.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tiff'}
     MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
+    COPY_CHUNK_SIZE = 1024 * 1024  # 1MB per read/write when saving uploads
     
     def __init__(self, base_path: str = "data/attachments"):
         self.base_path = Path(base_path)
@@ -62,20 +63,20 @@ class FileHandler:
                     detail=f"File too large. Maximum size: {self.MAX_FILE_SIZE // (1024*1024)}MB"
                 )
     
-    async def save_file(self, file: UploadFile) -> str:
-        """Save uploaded file and return relative path"""
+    def save_file(self, file: UploadFile) -> str:
+        """Save uploaded file and return relative path (blocking; call from a threadpool handler)"""
         self.validate_file(file)
         
         # Generate unique filename
         unique_filename = self.generate_unique_filename(file.filename)
         file_path = self.base_path / unique_filename
         
-        # Save file
+        # Save file in fixed-size chunks so memory stays constant whatever the upload size
         try:
             with open(file_path, "wb") as buffer:
-                content = await file.read()
-                buffer.write(content)
+                shutil.copyfileobj(file.file, buffer, self.COPY_CHUNK_SIZE)
         except Exception as e:
+            file_path.unlink(missing_ok=True)
             raise HTTPException(status_code=500, detail=f"Failed to save file: {str(e)}")
         
         # Return relative path
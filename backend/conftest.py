@@ -4,16 +4,15 @@ Pytest configuration file for SwatchX backend tests.
 import pytest
 import asyncio
 from httpx import AsyncClient
-from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, Session
-from sqlalchemy.pool import StaticPool
 from fastapi.testclient import TestClient
 from typing import Generator, AsyncGenerator
 
 # Import your app components
 from app.main import app
-from app.core.database import Base, get_db
+from app.core.database import Base, get_db, get_session_factory, make_engine
 from app.core.config import Settings
+from app.core.security import token_cache
 
 # Test database configuration - use in-memory SQLite
 TEST_DATABASE_URL = "sqlite:///:memory:"
@@ -35,17 +34,18 @@ def event_loop():
     loop.close()
 
 
+@pytest.fixture(autouse=True)
+def clear_token_cache():
+    """Each test gets a fresh database, so cached token -> user id mappings must not leak."""
+    token_cache.clear()
+    yield
+    token_cache.clear()
+
+
 @pytest.fixture(scope="function")
 def db_engine():
     """Create a test database engine."""
-    engine = create_engine(
-        TEST_DATABASE_URL,
-        connect_args={
-            "check_same_thread": False,
-        },
-        poolclass=StaticPool,
-        echo=False,  # Set to True for SQL debugging
-    )
+    engine = make_engine(TEST_DATABASE_URL, testing=True)
     Base.metadata.create_all(bind=engine)
     yield engine
     Base.metadata.drop_all(bind=engine)
@@ -74,6 +74,9 @@ def client(db_session: Session) -> Generator[TestClient, None, None]:
             pass
     
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_session_factory] = lambda: sessionmaker(
+        autocommit=False, autoflush=False, bind=db_session.get_bind()
+    )
     
     with TestClient(app) as test_client:
         yield test_client
@@ -92,6 +95,9 @@ async def async_client(db_session: Session) -> AsyncGenerator[AsyncClient, None]
             pass
     
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_session_factory] = lambda: sessionmaker(
+        autocommit=False, autoflush=False, bind=db_session.get_bind()
+    )
     
     async with AsyncClient(app=app, base_url="http://test") as async_test_client:
         yield async_test_client
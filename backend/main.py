@@ -1,5 +1,17 @@
 from app.main import app
+from app.core.config import settings
 
 if __name__ == "__main__":
+    import multiprocessing
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    multiprocessing.freeze_support()  # Worker processes in PyInstaller builds
+    uvicorn.run(
+        "app.main:app",
+        host="0.0.0.0",
+        port=8000,
+        loop="auto",  # uvloop when installed (uvicorn[standard]), asyncio otherwise
+        http="httptools",
+        workers=settings.server_workers,
+        limit_concurrency=settings.server_limit_concurrency,
+        access_log=False,
+    )
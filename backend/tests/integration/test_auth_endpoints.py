@@ -325,3 +325,116 @@ class TestProtectedEndpoint:
         for headers in malformed_headers:
             response = await async_client.get("/auth/me", headers=headers)
             assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+@pytest.mark.integration
+class TestPasswordResetEndpoint:
+    """Test cases for the /auth/password/reset-verify endpoint."""
+
+    def _create_user_with_questions(self, db_session: Session) -> User:
+        user = User(
+            email="resetuser@example.com",
+            hashed_password=get_password_hash("OldPass123!"),
+            security_question_1="What was your first pet's name?",
+            security_answer_1_hash=get_password_hash("rex"),
+            security_question_2="What city were you born in?",
+            security_answer_2_hash=get_password_hash("toronto"),
+            security_question_3="What is your favourite colour?",
+            security_answer_3_hash=get_password_hash("blue"),
+        )
+        db_session.add(user)
+        db_session.commit()
+        return user
+
+    async def test_reset_verify_success(self, async_client: AsyncClient, db_session: Session):
+        """Test password reset with all correct security answers."""
+        self._create_user_with_questions(db_session)
+        
+        response = await async_client.post("/auth/password/reset-verify", json={
+            "email": "resetuser@example.com",
+            "answers": ["Rex", "toronto", "blue"],
+            "new_password": "NewPass123!",
+            "confirm_password": "NewPass123!"
+        })
+        
+        assert response.status_code == status.HTTP_200_OK
+        
+        login_response = await async_client.post(
+            "/auth/login",
+            data={"username": "resetuser@example.com", "password": "NewPass123!"}
+        )
+        assert login_response.status_code == status.HTTP_200_OK
+
+    async def test_reset_verify_wrong_answer(self, async_client: AsyncClient, db_session: Session):
+        """Test password reset is rejected when any security answer is wrong."""
+        self._create_user_with_questions(db_session)
+        
+        response = await async_client.post("/auth/password/reset-verify", json={
+            "email": "resetuser@example.com",
+            "answers": ["rex", "toronto", "green"],
+            "new_password": "NewPass123!",
+            "confirm_password": "NewPass123!"
+        })
+        
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.json()["detail"] == "One or more security answers are incorrect"
+
+    async def test_setup_security_questions_then_reset(self, async_client: AsyncClient, db_session: Session):
+        """Test answers stored via /auth/security-questions verify on reset."""
+        user = User(email="setupuser@example.com", hashed_password=get_password_hash("OldPass123!"))
+        db_session.add(user)
+        db_session.commit()
+        
+        login_response = await async_client.post(
+            "/auth/login",
+            data={"username": "setupuser@example.com", "password": "OldPass123!"}
+        )
+        headers = {"Authorization": f"Bearer {login_response.json()['access_token']}"}
+        
+        questions = [
+            {"question": "What was your first pet's name?", "answer": "rex", "current_password": "OldPass123!"},
+            {"question": "What city were you born in?", "answer": "toronto", "current_password": "OldPass123!"},
+            {"question": "What is your favourite colour?", "answer": "blue", "current_password": "OldPass123!"},
+        ]
+        setup_response = await async_client.post(
+            "/auth/security-questions", json={"questions": questions}, headers=headers
+        )
+        assert setup_response.status_code == status.HTTP_200_OK
+        
+        response = await async_client.post("/auth/password/reset-verify", json={
+            "email": "setupuser@example.com",
+            "answers": ["rex", "toronto", "blue"],
+            "new_password": "NewPass123!",
+            "confirm_password": "NewPass123!"
+        })
+        assert response.status_code == status.HTTP_200_OK
+
+    async def test_update_individual_question_then_reset(self, async_client: AsyncClient, db_session: Session):
+        """Test that updating one question only changes that question and answer."""
+        self._create_user_with_questions(db_session)
+        
+        login_response = await async_client.post(
+            "/auth/login",
+            data={"username": "resetuser@example.com", "password": "OldPass123!"}
+        )
+        headers = {"Authorization": f"Bearer {login_response.json()['access_token']}"}
+        
+        update_response = await async_client.put("/auth/security-questions/individual", json={
+            "question": "What was your first car?",
+            "answer": "civic",
+            "current_password": "OldPass123!",
+            "question_index": 1
+        }, headers=headers)
+        assert update_response.status_code == status.HTTP_200_OK
+        
+        questions = (await async_client.get("/auth/security-questions", headers=headers)).json()
+        assert questions["question_1"] == "What was your first pet's name?"
+        assert questions["question_2"] == "What was your first car?"
+        
+        response = await async_client.post("/auth/password/reset-verify", json={
+            "email": "resetuser@example.com",
+            "answers": ["rex", "civic", "blue"],
+            "new_password": "NewPass123!",
+            "confirm_password": "NewPass123!"
+        })
+        assert response.status_code == status.HTTP_200_OK
@@ -12,10 +12,12 @@ Tests the full expense lifecycle including:
 import pytest
 import json
 import io
-from datetime import date
+from datetime import date, datetime, timedelta
 from decimal import Decimal
 from httpx import AsyncClient
+from openpyxl import load_workbook
 from fastapi import status
+from sqlalchemy import event
 from sqlalchemy.orm import Session
 
 from app.models.expense import Expense, BusinessUnit, Truck, Trailer, FuelStation
@@ -221,6 +223,53 @@ class TestExpenseCRUDEndpoints:
         assert data[0]["company"] == "Swatch"
         assert data[0]["category"] == "fuel"
 
+    async def test_read_expenses_loads_relationships_in_one_query(self, async_client: AsyncClient, db_session: Session):
+        """Test that listing expenses does not lazy-load relationships row by row."""
+        # Arrange
+        user = User(email="testuser@example.com", hashed_password=get_password_hash("password123"))
+        db_session.add(user)
+        db_session.commit()
+        
+        login_response = await async_client.post(
+            "/auth/login",
+            data={"username": "testuser@example.com", "password": "password123"}
+        )
+        token = login_response.json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        for i in range(5):
+            db_session.add(Expense(
+                date=datetime(2024, 1, i + 1),
+                price=100.00,
+                description=f"Truck expense {i}",
+                category="truck",
+                company="Swatch",
+                truck=Truck(number=f"T-{i}"),
+                business_unit=BusinessUnit(name=f"Unit {i}")
+            ))
+        db_session.commit()
+        db_session.expunge_all()
+
+        statements = []
+        def record_statement(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+        engine = db_session.get_bind()
+        event.listen(engine, "before_cursor_execute", record_statement)
+        
+        # Act
+        try:
+            response = await async_client.get("/api/v1/expenses/", headers=headers)
+        finally:
+            event.remove(engine, "before_cursor_execute", record_statement)
+        
+        # Assert
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        assert len(data) == 5
+        assert all(expense["truck"] and expense["businessUnit"] for expense in data)
+        assert len([s for s in statements if "FROM expenses" in s]) == 1
+        assert not any("FROM trucks" in s or "FROM business_units" in s for s in statements)
+
     async def test_read_single_expense_success(self, async_client: AsyncClient, db_session: Session):
         """Test reading a single expense by ID."""
         # Arrange
@@ -323,6 +372,67 @@ class TestExpenseCRUDEndpoints:
         assert expense.description == "Updated description"
         assert expense.category == "truck"
 
+    async def test_update_expense_partial_fields(self, async_client: AsyncClient, db_session: Session):
+        """Test that an update only changes the fields that were sent."""
+        # Arrange
+        user = User(email="testuser@example.com", hashed_password=get_password_hash("password123"))
+        db_session.add(user)
+        db_session.commit()
+        
+        login_response = await async_client.post(
+            "/auth/login",
+            data={"username": "testuser@example.com", "password": "password123"}
+        )
+        token = login_response.json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        truck = Truck(number="T-100")
+        db_session.add(truck)
+        db_session.commit()
+
+        expense = Expense(
+            date=datetime(2024, 1, 15),
+            price=100.00,
+            description="Original description",
+            category="truck",
+            company="Swatch",
+            truck_id=truck.id
+        )
+        db_session.add(expense)
+        db_session.commit()
+        db_session.refresh(expense)
+        
+        update_data = {
+            "date": "2024-01-15T00:00:00Z",
+            "price": 150.75,
+            "description": "Updated description",
+            "category": "trailer"
+        }
+        
+        # Act
+        response = await async_client.put(
+            f"/api/v1/expenses/{expense.id}",
+            data={"expense_data": json.dumps(update_data)},
+            headers=headers
+        )
+        
+        # Assert
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        
+        assert data["price"] == 150.75
+        assert data["description"] == "Updated description"
+        assert data["category"] == "trailer"
+        assert data["company"] == "Swatch"  # Unchanged
+        assert data["truck"]["number"] == "T-100"  # Relationship still loaded
+        
+        # Verify in database
+        db_session.refresh(expense)
+        assert expense.price == 150.75
+        assert expense.description == "Updated description"
+        assert expense.category == "trailer"
+        assert expense.truck_id == truck.id
+
     async def test_delete_expense_success(self, async_client: AsyncClient, db_session: Session):
         """Test successful expense deletion."""
         # Arrange
@@ -478,6 +588,445 @@ class TestExpenseCRUDEndpoints:
         data = response.json()
         assert len(data) == 5
 
+    async def test_expense_keyset_pagination(self, async_client: AsyncClient, db_session: Session):
+        """Test paging expenses with a (date, id) cursor instead of skip."""
+        # Arrange
+        user = User(email="testuser@example.com", hashed_password=get_password_hash("password123"))
+        db_session.add(user)
+        db_session.commit()
+        
+        login_response = await async_client.post(
+            "/auth/login",
+            data={"username": "testuser@example.com", "password": "password123"}
+        )
+        token = login_response.json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        # Two expenses share a date so the id tie-breaker is exercised
+        for day in (1, 2, 2, 3, 4):
+            db_session.add(Expense(
+                date=datetime(2024, 1, day),
+                price=10.00,
+                description=f"Expense on day {day}",
+                category="truck",
+                company="Swatch"
+            ))
+        db_session.commit()
+        
+        # Act - follow the cursor two items at a time
+        seen = []
+        params = {"limit": 2}
+        while True:
+            response = await async_client.get("/api/v1/expenses/", params=params, headers=headers)
+            assert response.status_code == status.HTTP_200_OK
+            page = response.json()
+            if not page:
+                break
+            seen.extend(page)
+            params = {"limit": 2, "before_date": page[-1]["date"], "before_id": page[-1]["id"]}
+        
+        # Assert - same order as the unpaged listing, no gaps or repeats
+        response = await async_client.get("/api/v1/expenses/", headers=headers)
+        assert [e["id"] for e in seen] == [e["id"] for e in response.json()]
+        assert len(seen) == 5
+        
+        # A half-specified cursor is rejected
+        response = await async_client.get("/api/v1/expenses/?before_id=3", headers=headers)
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    async def test_stream_expenses(self, async_client: AsyncClient, db_session: Session):
+        """Test that the NDJSON stream matches the regular listing line for line."""
+        # Arrange
+        user = User(email="testuser@example.com", hashed_password=get_password_hash("password123"))
+        db_session.add(user)
+        db_session.commit()
+        
+        login_response = await async_client.post(
+            "/auth/login",
+            data={"username": "testuser@example.com", "password": "password123"}
+        )
+        token = login_response.json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        truck = Truck(number="T-100")
+        db_session.add(truck)
+        db_session.flush()
+        for day in (1, 2, 3):
+            db_session.add(Expense(
+                date=datetime(2024, 1, day),
+                price=10.00,
+                description=f"Expense on day {day}",
+                category="truck",
+                company="Swatch",
+                truck_id=truck.id
+            ))
+        db_session.commit()
+        
+        # Act
+        response = await async_client.get("/api/v1/expenses/stream", params={"company": "Swatch"}, headers=headers)
+        listing = await async_client.get("/api/v1/expenses/", params={"company": "Swatch"}, headers=headers)
+        
+        # Assert
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["content-type"] == "application/x-ndjson"
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert lines == listing.json()
+        assert lines[0]["truck"] == {"id": truck.id, "number": "T-100"}
+
+    async def test_read_expenses_gzip(self, async_client: AsyncClient, db_session: Session):
+        """Test that large listings are gzip-compressed for clients that accept it."""
+        # Arrange
+        user = User(email="testuser@example.com", hashed_password=get_password_hash("password123"))
+        db_session.add(user)
+        db_session.commit()
+        
+        login_response = await async_client.post(
+            "/auth/login",
+            data={"username": "testuser@example.com", "password": "password123"}
+        )
+        token = login_response.json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}", "Accept-Encoding": "gzip"}
+
+        for day in range(1, 21):
+            db_session.add(Expense(
+                date=datetime(2024, 1, day),
+                price=10.00,
+                description=f"Expense on day {day}",
+                category="truck",
+                company="Swatch"
+            ))
+        db_session.commit()
+        
+        # Act
+        response = await async_client.get("/api/v1/expenses/", headers=headers)
+        
+        # Assert - httpx decodes the body transparently
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["content-encoding"] == "gzip"
+        assert len(response.json()) == 20
+
+    async def test_analytics_monthly_totals(self, async_client: AsyncClient, db_session: Session):
+        """Test that monthly analytics bucket expenses by calendar month."""
+        # Arrange
+        user = User(email="testuser@example.com", hashed_password=get_password_hash("password123"))
+        db_session.add(user)
+        db_session.commit()
+        
+        login_response = await async_client.post(
+            "/auth/login",
+            data={"username": "testuser@example.com", "password": "password123"}
+        )
+        token = login_response.json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        now = datetime.now()
+        this_month = datetime(now.year, now.month, 1)
+        last_month = datetime(now.year - 1, 12, 1) if now.month == 1 else datetime(now.year, now.month - 1, 1)
+        next_month = datetime(now.year + 1, 1, 1) if now.month == 12 else datetime(now.year, now.month + 1, 1)
+        for when, price, category in (
+            (this_month, 29.50, "truck"),
+            (next_month - timedelta(microseconds=500000), 0.50, "truck"),  # Last half-second of this month
+            (this_month, 20.00, "fuel-diesel"),
+            (last_month, 25.00, "truck"),
+            (datetime(now.year - 2, 1, 1), 999.00, "truck"),  # Outside the window
+        ):
+            db_session.add(Expense(date=when, price=price, description="Analytics", category=category, company="Swatch"))
+        db_session.add(Expense(date=this_month, price=500.00, description="Other company", category="truck", company="SWS"))
+        db_session.commit()
+        
+        # Act
+        change = await async_client.get("/api/v1/analytics/monthly-change/Swatch", headers=headers)
+        top = await async_client.get("/api/v1/analytics/top-categories/Swatch", headers=headers)
+        
+        # Assert
+        assert change.status_code == status.HTTP_200_OK
+        data = change.json()
+        assert data["current_month"] == 50.0
+        assert data["previous_month"] == 25.0
+        assert data["percentage_change"] == 100.0
+        assert [m["total"] for m in data["monthly_trend"]][-2:] == [25.0, 50.0]
+        assert len(data["monthly_trend"]) == 6
+        
+        assert top.status_code == status.HTTP_200_OK
+        categories = {c["category"]: c for c in top.json()["top_categories"]}
+        assert [m["amount"] for m in categories["truck"]["monthly_data"]][-2:] == [25.0, 30.0]
+        assert [m["amount"] for m in categories["fuel-diesel"]["monthly_data"]][-2:] == [0.0, 20.0]
+
+    async def test_export_company_data(self, async_client: AsyncClient, db_session: Session):
+        """Test the Excel export's summary and category sheets."""
+        # Arrange
+        user = User(email="testuser@example.com", hashed_password=get_password_hash("password123"))
+        db_session.add(user)
+        db_session.commit()
+        
+        login_response = await async_client.post(
+            "/auth/login",
+            data={"username": "testuser@example.com", "password": "password123"}
+        )
+        token = login_response.json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        bu = BusinessUnit(name="Export BU")
+        truck = Truck(number="TRK-EXP")
+        db_session.add_all([bu, truck])
+        db_session.flush()
+        db_session.add_all([
+            Expense(date=datetime(2024, 1, 2), price=100.00, description="Tires", category="truck",
+                    company="Swatch", business_unit_id=bu.id, truck_id=truck.id),
+            Expense(date=datetime(2024, 1, 1), price=50.00, description="Oil", category="truck",
+                    company="Swatch", business_unit_id=bu.id, truck_id=truck.id),
+            Expense(date=datetime(2023, 12, 1), price=5.50, category="toll", company="Swatch"),
+            Expense(date=datetime(2024, 1, 1), price=999.00, category="toll", company="SWS"),
+        ])
+        db_session.commit()
+        
+        # Act
+        response = await async_client.get("/api/v1/export/Swatch", headers=headers)
+        
+        # Assert
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["content-disposition"].startswith('attachment; filename="SWATCH_Expenses_Export_')
+        assert "content-encoding" not in response.headers
+        wb = load_workbook(io.BytesIO(response.content))
+        assert wb.sheetnames == ["Summary", "Truck", "Toll"]
+        summary = [list(row) for row in wb["Summary"].iter_rows(values_only=True)]
+        assert summary[1:3] == [["Truck", 2, 150.0], ["Toll", 1, 5.5]]
+        assert summary[-1] == ["GRAND TOTAL", 3, 155.5]
+        trucks = [list(row) for row in wb["Truck"].iter_rows(values_only=True)]
+        assert trucks[0] == ["Date", "Business Unit", "Truck Number", "Description", "Price ($)"]
+        assert trucks[1:] == [
+            ["2024-01-02", "Export BU", "TRK-EXP", "Tires", 100.0],
+            ["2024-01-01", "Export BU", "TRK-EXP", "Oil", 50.0],
+        ]
+        assert wb["Truck"]["E2"].number_format == '"$"#,##0.00'
+        # Columns fit the longer of header and values, plus padding
+        assert wb["Truck"].column_dimensions["B"].width == len("Business Unit") + 2
+        assert wb["Truck"].column_dimensions["D"].width == len("Description") + 2
+        assert wb["Summary"].column_dimensions["A"].width == len("GRAND TOTAL") + 2
+
+    async def test_download_attachment_uncompressed(self, async_client: AsyncClient, db_session: Session, tmp_path):
+        """Test that attachments are sent as stored, bypassing gzip."""
+        # Arrange
+        user = User(email="testuser@example.com", hashed_password=get_password_hash("password123"))
+        db_session.add(user)
+        db_session.commit()
+        
+        login_response = await async_client.post(
+            "/auth/login",
+            data={"username": "testuser@example.com", "password": "password123"}
+        )
+        token = login_response.json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}", "Accept-Encoding": "gzip"}
+
+        content = b"%PDF-1.4 " + b"0" * 4096
+        receipt = tmp_path / "receipt.pdf"
+        receipt.write_bytes(content)
+        expense = Expense(date=datetime(2024, 1, 1), price=10.00, description="Receipt",
+                          category="truck", company="Swatch", attachment_path=str(receipt))
+        missing = Expense(date=datetime(2024, 1, 1), price=10.00, description="Missing file",
+                          category="truck", company="Swatch", attachment_path=str(tmp_path / "gone.pdf"))
+        db_session.add_all([expense, missing])
+        db_session.commit()
+        
+        # Act
+        response = await async_client.get(f"/api/v1/expenses/{expense.id}/attachment", headers=headers)
+        missing_response = await async_client.get(f"/api/v1/expenses/{missing.id}/attachment", headers=headers)
+        
+        # Assert
+        assert response.status_code == status.HTTP_200_OK
+        assert "content-encoding" not in response.headers
+        assert response.headers["content-length"] == str(len(content))
+        assert response.content == content
+        assert missing_response.status_code == status.HTTP_404_NOT_FOUND
+
+    async def test_delete_expense_removes_attachment_file(self, async_client: AsyncClient, db_session: Session, tmp_path):
+        """Test that deleting an expense also unlinks its attachment file."""
+        # Arrange
+        user = User(email="testuser@example.com", hashed_password=get_password_hash("password123"))
+        db_session.add(user)
+        db_session.commit()
+        
+        login_response = await async_client.post(
+            "/auth/login",
+            data={"username": "testuser@example.com", "password": "password123"}
+        )
+        token = login_response.json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        receipt = tmp_path / "receipt.pdf"
+        receipt.write_bytes(b"%PDF-1.4")
+        expense = Expense(date=datetime(2024, 1, 1), price=10.00, description="Receipt",
+                          category="truck", company="Swatch", attachment_path=str(receipt))
+        db_session.add(expense)
+        db_session.commit()
+        
+        # Act
+        response = await async_client.delete(f"/api/v1/expenses/{expense.id}", headers=headers)
+        
+        # Assert - the unlink runs as a background task once the response is sent
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["deleted_id"] == expense.id
+        assert not receipt.exists()
+
+    async def test_pie_chart_data(self, async_client: AsyncClient, db_session: Session):
+        """Test pie chart category totals for all time and the current month."""
+        # Arrange
+        user = User(email="testuser@example.com", hashed_password=get_password_hash("password123"))
+        db_session.add(user)
+        db_session.commit()
+        
+        login_response = await async_client.post(
+            "/auth/login",
+            data={"username": "testuser@example.com", "password": "password123"}
+        )
+        token = login_response.json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        now = datetime.now()
+        this_month = datetime(now.year, now.month, 1)
+        for when, price, category in (
+            (this_month, 40.00, "truck"),
+            (this_month, 10.00, "toll"),
+            (datetime(2020, 1, 1), 100.00, "toll"),
+        ):
+            db_session.add(Expense(date=when, price=price, description="Pie", category=category, company="Swatch"))
+        db_session.commit()
+        
+        # Act
+        total = await async_client.get("/api/v1/pie-chart-data/Swatch", headers=headers)
+        month = await async_client.get("/api/v1/pie-chart-data/Swatch?period=this-month", headers=headers)
+        
+        # Assert
+        assert total.status_code == status.HTTP_200_OK
+        assert [(d["category"], d["value"]) for d in total.json()["data"]] == [("toll", 110.0), ("truck", 40.0)]
+        assert total.json()["total_amount"] == 150.0
+        assert [(d["category"], d["value"]) for d in month.json()["data"]] == [("truck", 40.0), ("toll", 10.0)]
+        assert month.json()["category_count"] == 2
+
+    async def test_read_expenses_include_total(self, async_client: AsyncClient, db_session: Session):
+        """Test that include_total reports the filtered count alongside a page."""
+        # Arrange
+        user = User(email="testuser@example.com", hashed_password=get_password_hash("password123"))
+        db_session.add(user)
+        db_session.commit()
+        
+        login_response = await async_client.post(
+            "/auth/login",
+            data={"username": "testuser@example.com", "password": "password123"}
+        )
+        token = login_response.json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        for day, company in ((1, "Swatch"), (2, "Swatch"), (3, "Swatch"), (4, "SWS")):
+            db_session.add(Expense(
+                date=datetime(2024, 1, day),
+                price=10.00,
+                description=f"Expense on day {day}",
+                category="truck",
+                company=company
+            ))
+        db_session.commit()
+        
+        # Act
+        response = await async_client.get(
+            "/api/v1/expenses/",
+            params={"company": "Swatch", "limit": 2, "include_total": True},
+            headers=headers
+        )
+        past_end = await async_client.get(
+            "/api/v1/expenses/",
+            params={"company": "Swatch", "skip": 10, "include_total": True},
+            headers=headers
+        )
+        
+        # Assert - the list shape is unchanged; the total comes in a header
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.json()) == 2
+        assert response.headers["X-Total-Count"] == "3"
+        assert past_end.json() == []
+        assert past_end.headers["X-Total-Count"] == "3"
+        
+        # The frontend runs on another origin, so CORS must expose the header
+        cross_origin = await async_client.get(
+            "/api/v1/expenses/",
+            params={"include_total": True},
+            headers={**headers, "Origin": "http://localhost:5173"}
+        )
+        assert "x-total-count" in cross_origin.headers["Access-Control-Expose-Headers"].lower()
+
+    async def test_create_expenses_bulk(self, async_client: AsyncClient, db_session: Session):
+        """Test creating several expenses in one request."""
+        # Arrange
+        user = User(email="testuser@example.com", hashed_password=get_password_hash("password123"))
+        db_session.add(user)
+        db_session.commit()
+        
+        login_response = await async_client.post(
+            "/auth/login",
+            data={"username": "testuser@example.com", "password": "password123"}
+        )
+        token = login_response.json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        items = [
+            {
+                "company": "Swatch",
+                "category": "toll",
+                "date": f"2024-01-{day:02d}T00:00:00Z",
+                "price": 5.25,
+                "description": f"Toll {day}"
+            }
+            for day in range(1, 11)
+        ]
+        
+        # Act
+        response = await async_client.post("/api/v1/expenses/bulk", json=items, headers=headers)
+        
+        # Assert
+        assert response.status_code == status.HTTP_201_CREATED
+        data = response.json()
+        assert len(data["created_ids"]) == 10
+        assert db_session.query(Expense).filter(Expense.category == "toll").count() == 10
+        
+        # One invalid item rejects the whole batch
+        items[3]["description"] = "   "
+        response = await async_client.post("/api/v1/expenses/bulk", json=items, headers=headers)
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.json()["detail"] == "Expense 3: Description is required"
+        assert db_session.query(Expense).count() == 10
+
+    async def test_create_expenses_bulk_ignores_attachment_path(self, async_client: AsyncClient, db_session: Session):
+        """Test that bulk creates drop a client-supplied attachment_path."""
+        # Arrange
+        user = User(email="testuser@example.com", hashed_password=get_password_hash("password123"))
+        db_session.add(user)
+        db_session.commit()
+        
+        login_response = await async_client.post(
+            "/auth/login",
+            data={"username": "testuser@example.com", "password": "password123"}
+        )
+        token = login_response.json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        item = {
+            "company": "Swatch",
+            "category": "toll",
+            "date": "2024-01-01T00:00:00Z",
+            "price": 5.25,
+            "description": "Toll",
+            "attachment_path": "data/swatchx.db"
+        }
+        
+        # Act
+        response = await async_client.post("/api/v1/expenses/bulk", json=[item], headers=headers)
+        
+        # Assert
+        assert response.status_code == status.HTTP_201_CREATED
+        expense_id = response.json()["created_ids"][0]
+        assert db_session.get(Expense, expense_id).attachment_path is None
+        attachment_response = await async_client.get(f"/api/v1/expenses/{expense_id}/attachment", headers=headers)
+        assert attachment_response.status_code == status.HTTP_404_NOT_FOUND
+
     async def test_unauthorized_access(self, async_client: AsyncClient):
         """Test that expense endpoints require authentication."""
         # Act & Assert - GET without auth
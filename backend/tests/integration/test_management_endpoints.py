@@ -95,6 +95,40 @@ class TestBusinessUnitEndpoints:
         assert "BU Two" in names
         assert "BU Three" in names
 
+    async def test_read_trucks_etag_revalidation(self, async_client: AsyncClient, db_session: Session):
+        """Test that an unchanged list revalidates with 304 and a changed one does not."""
+        # Arrange
+        user = User(email="testuser@example.com", hashed_password=get_password_hash("password123"))
+        db_session.add(user)
+        db_session.commit()
+        
+        login_response = await async_client.post(
+            "/auth/login",
+            data={"username": "testuser@example.com", "password": "password123"}
+        )
+        token = login_response.json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        db_session.add(Truck(number="TRK-001"))
+        db_session.commit()
+        
+        first = await async_client.get("/api/v1/trucks/", headers=headers)
+        etag = first.headers["etag"]
+        
+        # Act
+        unchanged = await async_client.get("/api/v1/trucks/", headers={**headers, "If-None-Match": etag})
+        db_session.add(Truck(number="TRK-002"))
+        db_session.commit()
+        changed = await async_client.get("/api/v1/trucks/", headers={**headers, "If-None-Match": etag})
+        
+        # Assert
+        assert unchanged.status_code == status.HTTP_304_NOT_MODIFIED
+        assert unchanged.content == b""
+        assert unchanged.headers["etag"] == etag
+        assert changed.status_code == status.HTTP_200_OK
+        assert changed.headers["etag"] != etag
+        assert len(changed.json()) == 2
+
     async def test_update_business_unit_success(self, async_client: AsyncClient, db_session: Session):
         """Test successful business unit update."""
         # Arrange
@@ -437,6 +471,39 @@ class TestManagementEndpointsValidation:
         )
         assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
 
+    async def test_update_business_unit_unchanged(self, async_client: AsyncClient, db_session: Session):
+        """Test that a PUT with identical values succeeds without touching updated_at."""
+        # Arrange
+        user = User(email="testuser@example.com", hashed_password=get_password_hash("password123"))
+        db_session.add(user)
+        db_session.commit()
+        
+        login_response = await async_client.post(
+            "/auth/login",
+            data={"username": "testuser@example.com", "password": "password123"}
+        )
+        token = login_response.json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        bu = BusinessUnit(name="Same Name")
+        db_session.add(bu)
+        db_session.commit()
+        db_session.refresh(bu)
+        
+        # Act
+        response = await async_client.put(
+            f"/api/v1/business-units/{bu.id}",
+            json={"name": "Same Name"},
+            headers=headers
+        )
+        
+        # Assert
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        assert data["id"] == bu.id
+        assert data["name"] == "Same Name"
+        assert data["updated_at"] is None
+
     async def test_update_nonexistent_entity(self, async_client: AsyncClient, db_session: Session):
         """Test updating non-existent entities."""
         # Arrange
@@ -4,9 +4,13 @@ Unit tests for user models and schemas.
 import pytest
 from datetime import datetime
 from faker import Faker
+from sqlalchemy import text
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
 from pydantic import ValidationError
 
+from app.core.database import create_missing_schema, make_engine
+from app.models.expense import CompanyEnum, Expense
 from app.models.user import User
 from app.schemas.user import UserCreate, UserLogin, UserResponse
 
@@ -69,6 +73,24 @@ class TestUserModel:
         assert user.created_at is not None
         assert user.updated_at is None  # Only set on update
 
+    def test_has_security_questions(self, db_session):
+        """Test the has_security_questions hybrid on instances and in SQL."""
+        user = User(email="test@example.com", hashed_password="hashed_password_123")
+        db_session.add(user)
+        db_session.commit()
+
+        assert user.has_security_questions is False
+        assert db_session.query(User).filter(User.has_security_questions).count() == 0
+
+        user.security_question_1, user.security_answer_1_hash = "Q1", "A1"
+        user.security_question_2, user.security_answer_2_hash = "Q2", "A2"
+        user.security_question_3, user.security_answer_3_hash = "Q3", "A3"
+        db_session.commit()
+
+        assert user.has_security_questions is True
+        assert db_session.query(User).filter(User.has_security_questions).count() == 1
+        assert UserResponse.model_validate(user).has_security_questions is True
+
 
 @pytest.mark.unit
 class TestUserSchemas:
@@ -184,3 +206,54 @@ class TestUserSchemas:
             password="anypassword"
         )
         assert user_login.email == "test@example.com"
+
+
+@pytest.mark.unit
+class TestLegacySchemaUpgrade:
+    """Test upgrading a database created by an earlier release."""
+
+    def test_enum_names_rewritten_to_values(self):
+        """Test that rows stored as SQLEnum member names are rewritten once, idempotently."""
+        engine = make_engine("sqlite://", testing=True)
+        with engine.begin() as connection:
+            # expenses as the SQLEnum-backed model created it: names stored, no CHECKs
+            connection.execute(text(
+                "CREATE TABLE expenses (id INTEGER PRIMARY KEY, company VARCHAR(6) NOT NULL, "
+                "category VARCHAR(15) NOT NULL, date DATETIME NOT NULL, price FLOAT NOT NULL, "
+                "description VARCHAR(500), gallons FLOAT, business_unit_id INTEGER, truck_id INTEGER, "
+                "trailer_id INTEGER, fuel_station_id INTEGER, attachment_path VARCHAR(500), "
+                "created_at DATETIME DEFAULT CURRENT_TIMESTAMP, updated_at DATETIME)"
+            ))
+            connection.execute(text(
+                "INSERT INTO expenses (company, category, date, price) VALUES "
+                "('SWATCH', 'FUEL_DIESEL', '2024-01-01 00:00:00', 10.0), "
+                "('SWS', 'PHONE_TRACKER', '2024-01-02 00:00:00', 20.0), "
+                "('Swatch', 'truck', '2024-01-03 00:00:00', 30.0)"
+            ))
+        
+        create_missing_schema(engine)
+        create_missing_schema(engine)  # A second startup changes nothing
+        
+        with engine.connect() as connection:
+            rows = connection.execute(text("SELECT company, category FROM expenses ORDER BY id")).all()
+        assert [tuple(row) for row in rows] == [
+            ("Swatch", "fuel-diesel"),
+            ("SWS", "phone-tracker"),
+            ("Swatch", "truck"),
+        ]
+        with Session(engine) as session:
+            assert session.query(Expense).filter(Expense.company == CompanyEnum.SWATCH).count() == 2
+        engine.dispose()
+
+
+@pytest.mark.unit
+class TestExpenseModel:
+    """Test cases for the Expense model."""
+
+    def test_foreign_keys_enforced(self, db_session):
+        """Test that an expense cannot reference a missing truck."""
+        db_session.add(Expense(date=datetime(2024, 1, 1), price=10.0, description="Orphan",
+                               category="truck", company="Swatch", truck_id=999))
+        with pytest.raises(IntegrityError):
+            db_session.commit()
+        db_session.rollback()
@@ -4,14 +4,20 @@ Unit tests for security utilities (password hashing, JWT tokens).
 import pytest
 from datetime import datetime, timedelta, timezone
 from jose import jwt, JWTError
+from passlib.hash import bcrypt
 
 from app.core.security import (
     verify_password,
+    verify_and_update_password,
     get_password_hash,
     create_access_token,
-    verify_token
+    verify_token,
+    get_token_user,
+    forget_user_tokens,
+    token_cache
 )
 from app.core.config import settings
+from app.models.user import User
 
 
 @pytest.mark.unit
@@ -58,6 +64,23 @@ class TestPasswordSecurity:
         assert verify_password(password, hash1) is True
         assert verify_password(password, hash2) is True
 
+    def test_new_hashes_use_argon2id(self):
+        """Test new password hashes are Argon2id."""
+        hashed = get_password_hash("MySecurePassword123!")
+        
+        assert hashed.startswith("$argon2id$")
+
+    def test_legacy_bcrypt_hash_is_upgraded(self):
+        """Test legacy bcrypt hashes still verify and yield an Argon2id replacement."""
+        password = "MySecurePassword123!"
+        legacy_hash = bcrypt.hash(password)
+        
+        verified, new_hash = verify_and_update_password(password, legacy_hash)
+        
+        assert verified is True
+        assert new_hash.startswith("$argon2id$")
+        assert verify_password(password, new_hash) is True
+
 
 @pytest.mark.unit
 class TestJWTSecurity:
@@ -143,3 +166,53 @@ class TestJWTSecurity:
         # Decode without specifying algorithm to check header
         unverified_payload = jwt.get_unverified_header(token)
         assert unverified_payload["alg"] == settings.algorithm
+
+
+@pytest.mark.unit
+class TestTokenCache:
+    """Test cases for the verified-token cache."""
+
+    def test_token_user_is_cached(self, db_session):
+        """Test that a verified token is remembered and resolves to the same user."""
+        user = User(email="test@example.com", hashed_password="hashed_password_123")
+        db_session.add(user)
+        db_session.commit()
+        token = create_access_token({"sub": "test@example.com"})
+
+        assert get_token_user(db_session, token).id == user.id
+        assert len(token_cache) == 1
+        assert get_token_user(db_session, token).id == user.id
+
+    def test_invalid_token_is_not_cached(self, db_session):
+        """Test that tokens which fail verification are never cached."""
+        assert get_token_user(db_session, "invalid.token.here") is None
+        assert len(token_cache) == 0
+
+    def test_forget_user_tokens(self, db_session):
+        """Test that a user's cached tokens can be dropped."""
+        user = User(email="test@example.com", hashed_password="hashed_password_123")
+        db_session.add(user)
+        db_session.commit()
+        get_token_user(db_session, create_access_token({"sub": "test@example.com"}))
+
+        forget_user_tokens(user.id)
+        assert len(token_cache) == 0
+
+    def test_cached_token_rejected_after_id_reuse(self, db_session):
+        """Test that a cached token does not resolve to a different user given the same id."""
+        user = User(email="test@example.com", hashed_password="hashed_password_123")
+        db_session.add(user)
+        db_session.commit()
+        user_id = user.id
+        token = create_access_token({"sub": "test@example.com"})
+        get_token_user(db_session, token)
+
+        # Deleted on another worker, so this process's cache was never told
+        db_session.delete(user)
+        db_session.commit()
+        other = User(id=user_id, email="other@example.com", hashed_password="hashed_password_456")
+        db_session.add(other)
+        db_session.commit()
+
+        assert get_token_user(db_session, token) is None
+        assert len(token_cache) == 0